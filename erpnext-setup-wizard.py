@@ -12,18 +12,22 @@ Usage:
     uv run erpnext-setup-wizard.py setup                  # explicit setup subcommand
     uv run erpnext-setup-wizard.py --lang en              # setup with language preset
     uv run erpnext-setup-wizard.py setup --config deploy.yml
+    uv run erpnext-setup-wizard.py setup --config deploy.yml --resume
     uv run erpnext-setup-wizard.py upgrade --version v16.8.0
     uv run erpnext-setup-wizard.py exec
     uv run erpnext-setup-wizard.py status
+    uv run erpnext-setup-wizard.py cache list
+    uv run erpnext-setup-wizard.py --trace trace.jsonl setup
 """
 
 import sys
 
+from wizard import journal, trace
 from wizard.config_loader import build_parser, load_config
-from wizard.i18n import init as i18n_init, select_language
-from wizard.ui import banner
+from wizard.i18n import init as i18n_init, select_language, t
+from wizard.ui import banner, info
 from wizard.utils import clear_screen
-from wizard.ssh import create_executor
+from wizard.ssh import create_executor, report_connection_reuse
 from wizard.steps import (
     run_prerequisites,
     run_configure,
@@ -56,12 +60,27 @@ def _run_setup(args, lang: str) -> None:
     else:
         cfg = run_configure()
 
+    trace.add_secrets(
+        cfg.db_password, cfg.admin_password, cfg.smtp_password,
+        cfg.backup_s3_access_key, cfg.backup_s3_secret_key,
+        *(site["admin_password"] for site in cfg.extra_sites),
+    )
     executor = create_executor(cfg)
 
-    run_prerequisites(cfg, executor)
-    run_env_file(cfg, executor)
-    run_docker(cfg, executor)
-    run_site(cfg, executor)
+    plan_only = getattr(args, "plan", False)
+    try:
+        run_prerequisites(cfg, executor)
+        resume = getattr(args, "resume", False)
+        # A plan changes nothing, so it must not start a new journal either
+        if not plan_only and not journal.start(executor, cfg, resume) and resume:
+            info(t("common.resume_no_journal"))
+        run_env_file(cfg, executor)
+        run_docker(cfg, executor, plan_only=plan_only)
+        if not plan_only:
+            run_site(cfg, executor)
+    finally:
+        executor.close()
+    report_connection_reuse(executor)
 
 
 def _run_upgrade(args, lang: str) -> None:
@@ -84,6 +103,13 @@ def _run_status(args, lang: str) -> None:
     run_status(args)
 
 
+def _run_cache(args, lang: str) -> None:
+    """List or prune cached site snapshots."""
+    from wizard.commands.cache import run_cache
+    i18n_init(lang)
+    run_cache(args)
+
+
 # ── Main dispatch ───────────────────────────────────────────────
 
 
@@ -99,17 +125,26 @@ def main():
     # Default to setup when no subcommand is given
     command = args.command or "setup"
 
-    if command == "setup":
-        _run_setup(args, lang)
-    elif command == "upgrade":
-        _run_upgrade(args, lang)
-    elif command == "exec":
-        _run_exec(args, lang)
-    elif command == "status":
-        _run_status(args, lang)
-    else:
-        parser.print_help()
-        sys.exit(1)
+    if getattr(args, "trace", None):
+        trace.enable(args.trace)
+
+    try:
+        if command == "setup":
+            _run_setup(args, lang)
+        elif command == "upgrade":
+            _run_upgrade(args, lang)
+        elif command == "exec":
+            _run_exec(args, lang)
+        elif command == "status":
+            _run_status(args, lang)
+        elif command == "cache":
+            _run_cache(args, lang)
+        else:
+            parser.print_help()
+            sys.exit(1)
+    finally:
+        if command in ("setup", "upgrade", "status", "cache"):
+            trace.print_summary()
 
 
 if __name__ == "__main__":
@@ -117,7 +152,6 @@ if __name__ == "__main__":
         main()
     except KeyboardInterrupt:
         from wizard.theme import console
-        from wizard.i18n import t
         try:
             msg = t("common.interrupted")
         except Exception:
@@ -128,7 +162,6 @@ if __name__ == "__main__":
         raise
     except Exception as e:
         from wizard.theme import console
-        from wizard.i18n import t
         try:
             msg = t("common.unexpected_error", error=str(e))
         except Exception:
@@ -1,11 +1,18 @@
-"""Registry of optional Frappe apps available for installation."""
+"""Registry of optional Frappe apps, branch detection and install ordering."""
 
+import ast
+import graphlib
 import shlex
 from typing import NamedTuple
 
 from .utils import run, version_branch
 
 
+# Fail instead of asking for credentials (e.g. a repo that went private);
+# lookups may run in the background, behind other prompts
+GIT_NO_PROMPT = {"GIT_TERMINAL_PROMPT": "0"}
+
+
 class AppInfo(NamedTuple):
     """Metadata for an installable Frappe app.
 
@@ -33,15 +40,14 @@ OPTIONAL_APPS: list[AppInfo] = [
 ]
 
 
-def detect_best_branch(repo_url: str, erpnext_version: str) -> str | None:
-    """Detect best compatible branch via git ls-remote.
+def list_branches(repo_url: str, timeout: float | None = None) -> set[str] | None:
+    """Branch names of *repo_url* via git ls-remote, or None on failure.
 
-    Checks branches in priority order: version-{major} > main > master > develop.
-    Returns the first match, or None if no suitable branch found.
+    Gives up after *timeout* seconds, if given.
     """
-    target = version_branch(erpnext_version)
     code, stdout, _ = run(
-        f"git ls-remote --heads {shlex.quote(repo_url)}", capture=True
+        f"git ls-remote --heads {shlex.quote(repo_url)}", capture=True,
+        env=GIT_NO_PROMPT, timeout=timeout,
     )
     if code != 0:
         return None
@@ -51,9 +57,85 @@ def detect_best_branch(repo_url: str, erpnext_version: str) -> str | None:
         parts = line.split("\t")
         if len(parts) == 2:
             branches.add(parts[1].removeprefix("refs/heads/"))
+    return branches
+
+
+def pick_branch(branches: set[str], erpnext_version: str) -> str | None:
+    """Best branch for *erpnext_version* among *branches*.
 
-    for candidate in [target, "main", "master", "develop"]:
+    Priority order: version-{major} > main > master > develop.
+    """
+    for candidate in [version_branch(erpnext_version), "main", "master", "develop"]:
         if candidate in branches:
             return candidate
-
     return None
+
+
+def detect_best_branch(repo_url: str, erpnext_version: str) -> str | None:
+    """Detect best compatible branch via git ls-remote.
+
+    Returns the first match of ``pick_branch``, or None if no suitable
+    branch found.
+    """
+    branches = list_branches(repo_url)
+    return pick_branch(branches, erpnext_version) if branches else None
+
+
+def parse_required_apps(hooks_source: str) -> list[str]:
+    """Read ``required_apps`` from an app's hooks.py source.
+
+    Entries may be plain names or repo paths/URLs ("frappe/erpnext",
+    "https://github.com/frappe/payments"); the app name is returned.
+    """
+    try:
+        tree = ast.parse(hooks_source)
+    except SyntaxError:
+        return []
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        if not any(isinstance(target, ast.Name) and target.id == "required_apps"
+                   for target in node.targets):
+            continue
+        try:
+            value = ast.literal_eval(node.value)
+        except ValueError:
+            return []
+        return [entry.rstrip("/").removesuffix(".git").rsplit("/", 1)[-1]
+                for entry in value if isinstance(entry, str)]
+    return []
+
+
+def install_order(requires: dict[str, list[str]],
+                  available: set[str]) -> tuple[list[str], dict[str, list[str]], list[str]]:
+    """Order apps so every app comes after the apps it requires.
+
+    *requires* maps each app to be installed (in the user's order) to its
+    ``required_apps``; *available* holds apps that are already there
+    (frappe, erpnext, anything fetched).  Returns (order, missing, cycle):
+    *missing* maps apps to requirements that are neither selected nor
+    available, *cycle* lists the apps of a dependency cycle, if any, in
+    which case *order* is the original order.
+    """
+    missing = {
+        app: [dep for dep in deps if dep not in requires and dep not in available]
+        for app, deps in requires.items()
+    }
+    missing = {app: deps for app, deps in missing.items() if deps}
+
+    graph = {app: [dep for dep in deps if dep in requires and dep != app]
+             for app, deps in requires.items()}
+    sorter = graphlib.TopologicalSorter(graph)
+    try:
+        sorter.prepare()
+    except graphlib.CycleError as e:
+        return list(requires), missing, list(dict.fromkeys(e.args[1]))
+
+    # Among apps that are ready, keep the user's order
+    position = {app: i for i, app in enumerate(requires)}
+    order = []
+    while sorter.is_active():
+        ready = sorted(sorter.get_ready(), key=position.__getitem__)
+        order.extend(ready)
+        sorter.done(*ready)
+    return order, missing, []
@@ -5,7 +5,8 @@ import json
 import shlex
 
 from ..theme import console
-from ..ui import step, ok, fail, info
+from ..ui import step, ok, fail, info, follow_stream, show_tail
+from ..stream import ProgressParser, DOCKER_BUILD_PROGRESS
 from ..i18n import t
 
 
@@ -46,10 +47,14 @@ def run_build_image(cfg, executor, cd_prefix: str = ""):
         f"-f images/custom/Containerfile ."
     )
 
-    code = executor.run(build_cmd)
+    # docker build logs run to tens of MB; stream them with a progress bar
+    progress = ProgressParser(DOCKER_BUILD_PROGRESS)
+    with executor.stream(build_cmd, parsers=[progress]) as out:
+        code = follow_stream(out, t("commands.build.building_image"), progress)
     if code == 0:
         ok(t("commands.build.image_built", tag=tag))
         return True
     else:
         fail(t("commands.build.build_failed"))
+        show_tail(out)
         return False
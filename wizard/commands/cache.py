@@ -0,0 +1,77 @@
+"""List or prune the golden-snapshot cache on the Docker host."""
+
+from rich.table import Table
+from rich import box
+
+from ..theme import console, ACCENT, MUTED
+from ..ui import ok, fail, info
+from ..ssh import LocalExecutor, SSHExecutor, report_connection_reuse
+from .. import snapshots
+from ..i18n import t
+
+
+def run_cache(args):
+    """Show cached snapshots, or evict them down to a size limit."""
+    if getattr(args, "ssh_host", None):
+        executor = SSHExecutor(
+            host=args.ssh_host,
+            user=getattr(args, "ssh_user", None) or "root",
+            port=getattr(args, "ssh_port", None) or 22,
+            key_path=getattr(args, "ssh_key", None) or "",
+        )
+    else:
+        executor = LocalExecutor()
+
+    if args.action == "prune":
+        _prune(executor, 0 if args.all else args.max_size)
+    else:
+        _list(executor)
+
+    console.print()
+    executor.close()
+    report_connection_reuse(executor)
+
+
+def _list(executor):
+    """Print a table of cached snapshots, most recently used first."""
+    cached = snapshots.list_snapshots(executor)
+    if not cached:
+        info(t("commands.cache.empty"))
+        return
+
+    table = Table(
+        title=t("commands.cache.title"),
+        box=box.ROUNDED,
+        border_style=ACCENT,
+    )
+    table.add_column(t("commands.cache.key"), style="bold")
+    table.add_column(t("commands.cache.version"))
+    table.add_column(t("commands.cache.apps"))
+    table.add_column(t("commands.cache.size"), justify="right")
+    table.add_column(t("commands.cache.created"), style=MUTED)
+
+    for snap in cached:
+        apps = ", ".join(app["name"] for app in snap.meta.get("apps", [])) or "-"
+        table.add_row(
+            snap.key,
+            f"{snap.meta.get('erpnext_version', '?')} ({snap.meta.get('db_type', '?')})",
+            apps,
+            f"{snap.size_kb / 1024:.0f} MB",
+            snap.meta.get("created", "?"),
+        )
+
+    console.print()
+    console.print(table)
+    total_mb = sum(snap.size_kb for snap in cached) / 1024
+    console.print(f"\n  {t('commands.cache.total', count=len(cached), size=f'{total_mb:.0f}')}")
+
+
+def _prune(executor, max_mb: int):
+    """Evict least recently used snapshots beyond *max_mb*."""
+    before = snapshots.list_snapshots(executor)
+    removed = snapshots.prune(executor, max_mb)
+    if not removed and sum(snap.size_kb for snap in before) > max_mb * 1024:
+        fail(t("commands.cache.prune_failed"))
+        return
+    freed_mb = sum(snap.size_kb for snap in removed) / 1024
+    ok(t("commands.cache.pruned", count=len(removed), size=f"{freed_mb:.0f}"))
@@ -7,7 +7,7 @@ from rich import box
 
 from ..theme import console, OK, WARN, ERR, ACCENT
 from ..ui import step, ok, fail
-from ..ssh import LocalExecutor, SSHExecutor
+from ..ssh import LocalExecutor, SSHExecutor, report_connection_reuse
 from ..i18n import t
 
 
@@ -84,3 +84,5 @@ def run_status(args):
                 version = line.split("=", 1)[1].strip().strip('"')
                 console.print(f"\n  ERPNext: [bold {ACCENT}]{version}[/]")
     console.print()
+    executor.close()
+    report_connection_reuse(executor)
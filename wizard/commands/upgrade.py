@@ -4,11 +4,11 @@ import re
 import shlex
 
 from ..theme import console
-from ..ui import step, ok, fail, info, banner
+from ..ui import step, ok, fail, info, banner, follow_stream, show_tail
 from ..utils import version_branch
 from ..versions import fetch_erpnext_versions
 from ..prompts import ask_version_field, confirm_action
-from ..ssh import LocalExecutor, SSHExecutor
+from ..ssh import LocalExecutor, SSHExecutor, report_connection_reuse
 from ..i18n import t
 
 
@@ -59,7 +59,7 @@ def run_upgrade(args):
     else:
         console.print()
         info(t("commands.upgrade.fetching_versions"))
-        versions = fetch_erpnext_versions()
+        versions = fetch_erpnext_versions(executor)
         target_version = ask_version_field(
             1, "\U0001f504", t("commands.upgrade.select_version"),
             choices=versions, default=current_version,
@@ -96,18 +96,17 @@ def run_upgrade(args):
     console.print()
     step(t("commands.upgrade.updating_env"))
     new_frappe = version_branch(target_version)
-    code = executor.run(
+    plan = executor.plan()
+    plan.add(
         f"{cd_prefix}sed -i "
         f"'s/ERPNEXT_VERSION=.*/ERPNEXT_VERSION={target_version}/' .env"
     )
-    if code != 0:
-        fail(t("commands.upgrade.env_updated"))
-        return
-    code = executor.run(
+    plan.add(
         f"{cd_prefix}sed -i "
         f"'s/FRAPPE_VERSION=.*/FRAPPE_VERSION={new_frappe}/' .env"
     )
-    if code != 0:
+    results = plan.run(stop_on_error=True)
+    if len(results) != len(plan) or not all(r.ok for r in results):
         fail(t("commands.upgrade.env_updated"))
         return
     ok(t("commands.upgrade.env_updated"))
@@ -132,11 +131,16 @@ def run_upgrade(args):
     # Step 6: Run migrate
     console.print()
     step(t("commands.upgrade.migrating"))
-    code = executor.run(f"{cd_prefix}docker compose exec -T backend bench --site all migrate")
+    migrate_cmd = f"{cd_prefix}docker compose exec -T backend bench --site all migrate"
+    with executor.stream(migrate_cmd) as out:
+        code = follow_stream(out, t("commands.upgrade.migrating"))
     if code == 0:
         ok(t("commands.upgrade.migrate_done"))
     else:
         fail(t("commands.upgrade.migrate_failed"))
+        show_tail(out)
 
     console.print()
     ok(t("commands.upgrade.complete", version=target_version))
+    executor.close()
+    report_connection_reuse(executor)
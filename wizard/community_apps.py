@@ -1,14 +1,20 @@
 """Discover community Frappe apps from awesome-frappe."""
 
+import json
 import os
 import re
 import shlex
 import shutil
 import tempfile
-from typing import NamedTuple
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, NamedTuple
 
-from .apps import OPTIONAL_APPS, detect_best_branch
-from .utils import run
+from . import trace
+from .apps import GIT_NO_PROMPT, OPTIONAL_APPS, list_branches, pick_branch
+from .utils import run, user_cache_dir
 
 
 class CommunityApp(NamedTuple):
@@ -19,74 +25,253 @@ class CommunityApp(NamedTuple):
     branch: str
 
 
+class IndexEntry(NamedTuple):
+    """An awesome-frappe app with all of its branches, before version matching."""
+    display_name: str
+    repo_name: str
+    repo_url: str
+    branches: frozenset[str]
+
+
+class IndexProgress:
+    """Repos checked so far out of all found, for a progress display."""
+
+    def __init__(self):
+        self.current = 0
+        self.total = 0
+
+
 _AWESOME_FRAPPE_URL = "https://github.com/gavindsouza/awesome-frappe.git"
+_README_URL = "https://raw.githubusercontent.com/gavindsouza/awesome-frappe/{ref}/README.md"
+_HTTP_TIMEOUT = 10
+_LS_REMOTE_WORKERS = 16
+_LS_REMOTE_TIMEOUT = 15  # seconds per repo
+
+_INDEX_FILE = "community_index.json"
+_INDEX_VERSION = 1
+_HEAD_TTL = 3600            # seconds between checks of awesome-frappe's HEAD
+_REPO_TTL = 7 * 24 * 3600   # seconds before a repo's branches are listed again
 _GITHUB_LINK_RE = re.compile(
     r"\[([^\]]+)\]\((https://github\.com/[^/]+/[^/)#?]+)\)"
 )
 
 
-def fetch_community_apps(erpnext_version: str) -> list[CommunityApp]:
-    """Fetch compatible community apps from awesome-frappe.
-
-    Clones awesome-frappe (shallow), parses README.md for GitHub links,
-    checks each app's branch compatibility via git ls-remote.
-    Returns only apps that have a compatible branch and are NOT already
-    in the official OPTIONAL_APPS list.
+def _readme_over_http(ref: str) -> Iterator[str]:
+    """README.md lines as they arrive over one HTTP GET of the raw file.
 
-    Returns an empty list on any failure (network, parse, etc).
+    Raises URLError/OSError on failure, possibly after some lines.  The
+    trace event is written once the generator finishes or fails.
     """
-    official_repos = {app.repo_name for app in OPTIONAL_APPS}
-    # Also exclude frappe and erpnext themselves
-    official_repos.update({"frappe", "erpnext", "bench", "frappe_docker"})
+    start = time.time()
+    size = 0
+    ok = False
+    try:
+        with urllib.request.urlopen(_README_URL.format(ref=ref), timeout=_HTTP_TIMEOUT) as resp:
+            for raw in resp:
+                size += len(raw)
+                yield raw.decode("utf-8", errors="replace")
+        ok = size > 0
+    finally:
+        trace.event("readme-fetch", method="http", bytes=size,
+                    duration=round(time.time() - start, 3), ok=ok)
+
 
+def _readme_over_git(ref: str) -> list[str] | None:
+    """README.md lines via a blobless, sparse clone; None on failure.
+
+    Only commit and tree objects are cloned and nothing is checked out;
+    ``git show`` then fetches the one README blob.
+    """
+    start = time.time()
     tmpdir = tempfile.mkdtemp(prefix="awesome-frappe-")
     try:
         code, _, _ = run(
-            f"git clone --depth 1 --quiet {shlex.quote(_AWESOME_FRAPPE_URL)} "
-            f"{shlex.quote(tmpdir)}",
-            capture=True,
+            f"git clone --depth 1 --filter=blob:none --no-checkout --sparse --quiet "
+            f"{shlex.quote(_AWESOME_FRAPPE_URL)} {shlex.quote(tmpdir)}",
+            capture=True, env=GIT_NO_PROMPT,
         )
-        if code != 0:
-            return []
-
-        readme_path = os.path.join(tmpdir, "README.md")
-        if not os.path.exists(readme_path):
-            return []
-
-        with open(readme_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        entries = _GITHUB_LINK_RE.findall(content)
-        if not entries:
-            return []
-
-        apps: list[CommunityApp] = []
-        seen: set[str] = set()
-
-        for display_name, url in entries:
-            url = url.rstrip("/")
-            parts = url.split("/")
-            repo_name = parts[-1]
-            if repo_name.endswith(".git"):
-                repo_name = repo_name[:-4]
-            org_repo = f"{parts[-2]}/{repo_name}"
-
-            # Skip duplicates, official apps, and non-app repos
-            if org_repo in seen or repo_name in official_repos:
-                continue
-            seen.add(org_repo)
-
-            # Check branch compatibility
-            repo_url = url if url.endswith(".git") else url + ".git"
-            branch = detect_best_branch(repo_url, erpnext_version)
-            if branch:
-                apps.append(CommunityApp(
-                    display_name=display_name,
-                    repo_name=repo_name,
-                    repo_url=repo_url,
-                    branch=branch,
-                ))
-
-        return apps
+        content = ""
+        if code == 0:
+            code, content, _ = run(
+                f"git -C {shlex.quote(tmpdir)} show {shlex.quote(ref)}:README.md",
+                capture=True, env=GIT_NO_PROMPT,
+            )
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(tmpdir) for name in names)
     finally:
         shutil.rmtree(tmpdir, ignore_errors=True)
+    ok = code == 0 and bool(content)
+    trace.event("readme-fetch", method="git", bytes=size,
+                duration=round(time.time() - start, 3), ok=ok)
+    return content.splitlines() if ok else None
+
+
+def _readme_repos(ref: str = "HEAD") -> list[dict] | None:
+    """App repos linked from awesome-frappe's README.md at *ref*.
+
+    Only that one file is transferred: a raw-file GET parsed as it
+    streams in, or if that fails, a blobless git clone.  With ``--trace``
+    the git path runs as well, so the trace compares both.  Returns None
+    if neither could read the README.
+    """
+    try:
+        repos = _parse_readme(_readme_over_http(ref)) or None
+    except (urllib.error.URLError, OSError):
+        repos = None
+    if repos is None or trace.enabled():
+        lines = _readme_over_git(ref)
+        if repos is None and lines is not None:
+            repos = _parse_readme(lines)
+    return repos
+
+
+def _parse_readme(lines: Iterable[str]) -> list[dict]:
+    """Candidate app repos linked from the README, in README order.
+
+    Parses line by line.  Skips duplicates and apps already in the
+    official OPTIONAL_APPS list.
+    """
+    official_repos = {app.repo_name for app in OPTIONAL_APPS}
+    # Also exclude frappe and erpnext themselves
+    official_repos.update({"frappe", "erpnext", "bench", "frappe_docker"})
+
+    repos: list[dict] = []
+    seen: set[str] = set()
+
+    links = (link for line in lines for link in _GITHUB_LINK_RE.findall(line))
+    for display_name, url in links:
+        url = url.rstrip("/")
+        parts = url.split("/")
+        repo_name = parts[-1]
+        if repo_name.endswith(".git"):
+            repo_name = repo_name[:-4]
+        org_repo = f"{parts[-2]}/{repo_name}"
+
+        # Skip duplicates, official apps, and non-app repos
+        if org_repo in seen or repo_name in official_repos:
+            continue
+        seen.add(org_repo)
+
+        repo_url = url if url.endswith(".git") else url + ".git"
+        repos.append({"display_name": display_name, "repo_name": repo_name,
+                      "repo_url": repo_url})
+    return repos
+
+
+def _awesome_frappe_head() -> str | None:
+    """Commit sha of awesome-frappe's HEAD, or None if unreachable."""
+    code, stdout, _ = run(
+        f"git ls-remote {shlex.quote(_AWESOME_FRAPPE_URL)} HEAD",
+        capture=True, env=GIT_NO_PROMPT, timeout=_LS_REMOTE_TIMEOUT,
+    )
+    sha = stdout.split("\t", 1)[0].strip()
+    return sha if code == 0 and sha else None
+
+
+def _load_index() -> dict:
+    try:
+        with open(os.path.join(user_cache_dir(), _INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if index.get("version") == _INDEX_VERSION else {}
+
+
+def _save_index(index: dict):
+    path = os.path.join(user_cache_dir(), _INDEX_FILE)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass  # the next run just rebuilds it
+
+
+def fetch_community_index(progress: IndexProgress | None = None) -> list[IndexEntry]:
+    """Fetch the community app index from awesome-frappe.
+
+    The index is kept in ``community_index.json`` under the user cache dir
+    and refreshed incrementally:
+
+    - at most every ``_HEAD_TTL``, a ``git ls-remote`` of awesome-frappe's
+      HEAD decides whether the README must be fetched and parsed again;
+    - a repo's branches (git ls-remote, several repos at a time, each
+      within ``_LS_REMOTE_TIMEOUT``) are re-listed once older than
+      ``_REPO_TTL`` (``_HEAD_TTL`` after a failure); *progress* counts
+      those probes.
+
+    Without network the cached index is used as is.  Independent of the
+    ERPNext version, so it can run before the version is chosen.
+
+    Returns an empty list on any failure (network, parse, etc).
+    """
+    now = time.time()
+    cache = _load_index()
+    repos = cache.get("repos", [])
+    heads = cache.get("heads", {})
+    head = cache.get("head")
+    head_checked = cache.get("head_checked", 0)
+
+    if not repos or now - head_checked > _HEAD_TTL:
+        current = _awesome_frappe_head()
+        if current is not None and (current != head or not repos):
+            found = _readme_repos(current)
+            if found is not None:
+                repos, head, head_checked = found, current, now
+        elif current is not None:
+            head_checked = now
+    if not repos:
+        return []
+
+    def is_stale(entry: dict) -> bool:
+        # A repo that failed to answer is retried sooner than a good one
+        ttl = _HEAD_TTL if entry.get("failed") else _REPO_TTL
+        return now - entry.get("checked", 0) > ttl
+
+    stale = [repo["repo_url"] for repo in repos if is_stale(heads.get(repo["repo_url"], {}))]
+    if progress is not None:
+        progress.total = len(stale)
+    with ThreadPoolExecutor(max_workers=_LS_REMOTE_WORKERS) as pool:
+        futures = {pool.submit(list_branches, url, _LS_REMOTE_TIMEOUT): url for url in stale}
+        for future in as_completed(futures):
+            url, branches = futures[future], future.result()
+            if branches is not None:
+                heads[url] = {"branches": sorted(branches), "checked": now}
+            else:
+                # Keep what the repo had last time
+                heads[url] = dict(heads.get(url, {"branches": []}), checked=now, failed=True)
+            if progress is not None:
+                progress.current += 1
+
+    urls = {repo["repo_url"] for repo in repos}
+    _save_index({
+        "version": _INDEX_VERSION,
+        "head": head,
+        "head_checked": head_checked,
+        "repos": repos,
+        "heads": {url: entry for url, entry in heads.items() if url in urls},
+    })
+
+    # README order; a repo that could never be listed is left out
+    return [
+        IndexEntry(repo["display_name"], repo["repo_name"], repo["repo_url"],
+                   frozenset(heads[repo["repo_url"]]["branches"]))
+        for repo in repos
+        if heads.get(repo["repo_url"], {}).get("branches")
+    ]
+
+
+def compatible_apps(index: list[IndexEntry], erpnext_version: str) -> list[CommunityApp]:
+    """The apps of *index* with a branch compatible with *erpnext_version*."""
+    apps: list[CommunityApp] = []
+    for entry in index:
+        branch = pick_branch(entry.branches, erpnext_version)
+        if branch:
+            apps.append(CommunityApp(
+                display_name=entry.display_name,
+                repo_name=entry.repo_name,
+                repo_url=entry.repo_url,
+                branch=branch,
+            ))
+    return apps
@@ -7,6 +7,7 @@ import sys
 import yaml
 
 from .steps.configure import Config
+from .snapshots import DEFAULT_MAX_MB
 
 
 # ── Shared argument helpers ─────────────────────────────────────
@@ -21,6 +22,12 @@ def _add_lang_arg(parser: argparse.ArgumentParser) -> None:
                         help="Language code (e.g., tr, en)")
 
 
+def _add_trace_arg(parser: argparse.ArgumentParser) -> None:
+    """Add --trace to a subparser so it works in any position (see _add_lang_arg)."""
+    parser.add_argument("--trace", type=str, default=argparse.SUPPRESS, metavar="FILE",
+                        help="Record every executed command to FILE as JSON lines")
+
+
 def _add_ssh_args(parser: argparse.ArgumentParser) -> None:
     """Add SSH-related arguments to *parser*."""
     ssh = parser.add_argument_group("SSH options")
@@ -43,7 +50,7 @@ def _add_project_arg(parser: argparse.ArgumentParser, default: str = "frappe_doc
 def build_parser() -> argparse.ArgumentParser:
     """Build the argument parser with subcommands.
 
-    Global flag:  --lang
+    Global flags: --lang, --trace
     Subcommands:  setup (default), upgrade, exec, status
     """
     parser = argparse.ArgumentParser(
@@ -51,6 +58,8 @@ def build_parser() -> argparse.ArgumentParser:
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument("--lang", type=str, help="Language code (e.g., tr, en)")
+    parser.add_argument("--trace", type=str, metavar="FILE",
+                        help="Record every executed command to FILE as JSON lines")
 
     # ── Subcommands ─────────────────────────────────────────
     subparsers = parser.add_subparsers(dest="command")
@@ -61,6 +70,7 @@ def build_parser() -> argparse.ArgumentParser:
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     _add_lang_arg(setup_p)
+    _add_trace_arg(setup_p)
     setup_p.add_argument("--config", type=str,
                          help="Path to YAML config file for unattended mode")
 
@@ -87,6 +97,26 @@ def build_parser() -> argparse.ArgumentParser:
                          help='Backup schedule (e.g. "@every 6h")')
     setup_p.add_argument("--sites", type=str,
                          help="Comma-separated extra site names")
+    setup_p.add_argument("--site-concurrency", type=int, default=2,
+                         help="Extra sites created in parallel (default: %(default)s)")
+    setup_p.add_argument("--fetch-concurrency", type=int, default=4,
+                         help="App repositories cloned in parallel (default: %(default)s)")
+    setup_p.add_argument("--extra-sites-strategy", choices=["install", "clone"],
+                         default=None,
+                         help="Create extra sites by installing apps, or by "
+                              "cloning the first site's database")
+    setup_p.add_argument("--resume", action="store_true",
+                         help="Skip the steps a previous, interrupted setup "
+                              "already finished")
+    setup_p.add_argument("--plan", action="store_true",
+                         help="Show which containers a re-run would create, "
+                              "recreate or remove, then stop without changing them")
+    setup_p.add_argument("--snapshot-cache", action="store_true",
+                         help="Reuse a cached snapshot of an identical install, "
+                              "and cache this one")
+    setup_p.add_argument("--snapshot-cache-size", type=int, default=None,
+                         metavar="MB",
+                         help="Snapshot cache size limit in MB (default: 4096)")
     setup_p.add_argument("--enable-portainer", action="store_true",
                          help="Enable Portainer container management UI")
     setup_p.add_argument("--build-image", action="store_true",
@@ -119,6 +149,7 @@ def build_parser() -> argparse.ArgumentParser:
         "upgrade", help="Upgrade an existing ERPNext installation",
     )
     _add_lang_arg(upgrade_p)
+    _add_trace_arg(upgrade_p)
     upgrade_p.add_argument("--version", type=str,
                            help="Target ERPNext version (e.g., v16.8.0)")
     _add_project_arg(upgrade_p)
@@ -129,6 +160,7 @@ def build_parser() -> argparse.ArgumentParser:
         "exec", help="Execute a command in a running container",
     )
     _add_lang_arg(exec_p)
+    _add_trace_arg(exec_p)
     _add_project_arg(exec_p)
     exec_p.add_argument("--service", type=str, default="backend",
                         help="Service name (default: %(default)s)")
@@ -141,9 +173,26 @@ def build_parser() -> argparse.ArgumentParser:
         "status", help="Show status of the ERPNext stack",
     )
     _add_lang_arg(status_p)
+    _add_trace_arg(status_p)
     _add_project_arg(status_p)
     _add_ssh_args(status_p)
 
+    # ── cache ────────────────────────────────────────────────
+    cache_p = subparsers.add_parser(
+        "cache", help="List or prune cached site snapshots",
+    )
+    _add_lang_arg(cache_p)
+    _add_trace_arg(cache_p)
+    cache_p.add_argument("action", choices=["list", "prune"],
+                         help="Show cached snapshots, or evict them")
+    cache_p.add_argument("--max-size", type=int, default=DEFAULT_MAX_MB,
+                         metavar="MB",
+                         help="prune: evict least recently used snapshots "
+                              "beyond this size (default: %(default)s)")
+    cache_p.add_argument("--all", action="store_true",
+                         help="prune: remove every snapshot")
+    _add_ssh_args(cache_p)
+
     return parser
 
 
@@ -157,6 +206,16 @@ def _require(data: dict, key: str, context: str = "config file") -> str:
     return data[key]
 
 
+def _arg(args, name: str, default):
+    """args.<name>, or *default* only if the option was not given.
+
+    Unlike ``or default``, keeps falsy values such as 0 so that the
+    validator can reject them.
+    """
+    value = getattr(args, name, None)
+    return default if value is None else value
+
+
 def _validate_config(cfg: Config) -> None:
     """Validate a Config object, raising SystemExit on invalid values."""
     errors = []
@@ -191,6 +250,14 @@ def _validate_config(cfg: Config) -> None:
     if cfg.deploy_mode == "remote":
         if not cfg.ssh_host:
             errors.append("ssh_host is required for remote mode")
+    if not isinstance(cfg.site_concurrency, int) or cfg.site_concurrency < 1:
+        errors.append(f"Invalid site_concurrency: {cfg.site_concurrency}")
+    if not isinstance(cfg.fetch_concurrency, int) or cfg.fetch_concurrency < 1:
+        errors.append(f"Invalid fetch_concurrency: {cfg.fetch_concurrency}")
+    if cfg.extra_sites_strategy not in ("install", "clone"):
+        errors.append(f"Invalid extra_sites_strategy: {cfg.extra_sites_strategy}")
+    if not isinstance(cfg.snapshot_cache_max_mb, int) or cfg.snapshot_cache_max_mb < 1:
+        errors.append(f"Invalid snapshot_cache_max_mb: {cfg.snapshot_cache_max_mb}")
 
     if errors:
         print("Configuration errors:", file=sys.stderr)
@@ -259,6 +326,11 @@ def _config_from_yaml(path: str) -> Config:
         community_apps=[],
         custom_apps=custom_apps,
         extra_sites=extra_sites,
+        site_concurrency=data.get("site_concurrency", 2),
+        fetch_concurrency=data.get("fetch_concurrency", 4),
+        extra_sites_strategy=data.get("extra_sites_strategy", "install"),
+        snapshot_cache=bool(data.get("snapshot_cache", False)),
+        snapshot_cache_max_mb=data.get("snapshot_cache_max_mb", DEFAULT_MAX_MB),
         domain=data.get("domain", ""),
         letsencrypt_email=data.get("letsencrypt_email", ""),
         ssh_host=ssh.get("host", ""),
@@ -349,6 +421,11 @@ def _config_from_args(args) -> Config | None:
         community_apps=[],
         custom_apps=custom_apps,
         extra_sites=extra_sites,
+        site_concurrency=_arg(args, "site_concurrency", 2),
+        fetch_concurrency=_arg(args, "fetch_concurrency", 4),
+        extra_sites_strategy=getattr(args, "extra_sites_strategy", None) or "install",
+        snapshot_cache=getattr(args, "snapshot_cache", False),
+        snapshot_cache_max_mb=_arg(args, "snapshot_cache_size", DEFAULT_MAX_MB),
         domain=getattr(args, "domain", None) or "",
         letsencrypt_email=getattr(args, "letsencrypt_email", None) or "",
         ssh_host=getattr(args, "ssh_host", None) or "",
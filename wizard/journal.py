@@ -0,0 +1,105 @@
+"""Checkpoint journal for resumable setups.
+
+Setup records every finished step (and sub-step, such as one app install)
+in ``.wizard-journal.json`` inside the frappe_docker directory, together
+with a hash of the inputs it ran with.  ``setup --resume`` then skips a
+step whose journal entry matches the current inputs and whose cheap probe
+(does the site exist, is the app in apps.txt, ...) still passes.
+
+Module-level state, like the trace recorder: ``start()`` once, then
+``completed()`` / ``record()`` from any step.
+"""
+
+import hashlib
+import json
+import os
+import shlex
+import time
+from typing import Callable, Iterable
+
+JOURNAL_FILE = ".wizard-journal.json"
+_VERSION = 1
+
+_executor = None
+_remote = False
+_resume = False
+_entries: dict[str, dict] = {}
+
+
+def _path() -> str:
+    return f"~/frappe_docker/{JOURNAL_FILE}" if _remote else JOURNAL_FILE
+
+
+def start(executor, cfg, resume: bool) -> bool:
+    """Open the journal in the frappe_docker directory (run after step 1).
+
+    With *resume*, loads the previous run's entries; otherwise starts a
+    new journal.  Returns False if resuming found no usable journal.
+    """
+    global _executor, _remote, _resume, _entries
+    _executor = executor
+    _remote = cfg.deploy_mode == "remote"
+    _resume = resume
+    _entries = {}
+    if not resume:
+        _save()
+        return True
+
+    code, out, _ = executor.run(f"cat {_path()}", capture=True)
+    try:
+        data = json.loads(out) if code == 0 else {}
+    except ValueError:
+        data = {}
+    if data.get("version") != _VERSION:
+        return False
+    _entries = data.get("steps", {})
+    return True
+
+
+def resuming() -> bool:
+    """True if this run resumes a previous one."""
+    return _resume
+
+
+def inputs_hash(inputs: Iterable = ()) -> str:
+    """Stable hash of a step's inputs (any JSON-serialisable values)."""
+    payload = json.dumps(list(inputs), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def completed(step: str, inputs: Iterable = (),
+              probe: Callable[[], bool] | None = None) -> bool:
+    """True if resuming and *step* already finished with the same inputs.
+
+    *probe*, if given, must also confirm that the step's result is still
+    in place; otherwise the step is run again.
+    """
+    if not _resume:
+        return False
+    entry = _entries.get(step)
+    if entry is None or entry.get("hash") != inputs_hash(inputs):
+        return False
+    return probe is None or probe()
+
+
+def record(step: str, inputs: Iterable = ()):
+    """Mark *step* as finished with *inputs*."""
+    if _executor is None:
+        return
+    _entries[step] = {"hash": inputs_hash(inputs),
+                      "at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    _save()
+
+
+def _save():
+    content = json.dumps({"version": _VERSION, "steps": _entries}, indent=2) + "\n"
+    if _remote:
+        _executor.run(
+            f"printf '%s' {shlex.quote(content)} > {_path()}.tmp && mv {_path()}.tmp {_path()}",
+            capture=True,
+        )
+        return
+    tmp = f"{JOURNAL_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, JOURNAL_FILE)
@@ -0,0 +1,114 @@
+"""Pull the ERPNext image in the background while the prompts are answered.
+
+The image tag is fixed as soon as the ERPNext version is chosen, yet
+nothing downloads until ``compose up`` in Step 4.  ``start()`` runs
+``docker pull`` on the Docker host (local, or over SSH without prompting)
+on a background thread; ``finish()`` waits for it right before
+``compose up`` and shows the layer progress meanwhile.  ``cancel()`` stops
+a pull that is no longer wanted (another version, or a custom image).  A
+failed pull is harmless: ``compose up`` pulls whatever is still missing.
+
+Module-level state, like the trace recorder.
+"""
+
+import re
+import shlex
+import threading
+import time
+
+from rich.progress import (
+    Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn,
+)
+
+from .theme import console, ACCENT, MUTED, OK
+from .ui import ok, info
+from .i18n import t
+
+_LAYER_RE = re.compile(r"^([0-9a-f]{12}): (.+)$")
+
+_images: list[str] = []
+_thread: threading.Thread | None = None
+_layers: dict[str, bool] = {}
+_failed: list[str] = []
+_stream = None
+_cancelled = threading.Event()
+
+
+def _track(line: str):
+    """Record a ``<layer>: <status>`` line of docker pull output."""
+    m = _LAYER_RE.match(line.strip())
+    if m:
+        layer, status = m.groups()
+        _layers[layer] = _layers.get(layer, False) or status in ("Pull complete", "Already exists")
+
+
+def _pull(executor, images: list[str]):
+    global _stream
+    for image in images:
+        if _cancelled.is_set():
+            return
+        # exec: aborting must stop docker pull itself, not just its shell
+        cmd = f"exec docker pull {shlex.quote(image)}"
+        with executor.stream(cmd, tail=20, parsers=[_track]) as out:
+            _stream = out
+            # cancel() may have come before the stream existed
+            if _cancelled.is_set():
+                return
+            out.wait()
+        if out.returncode != 0:
+            _failed.append(image)
+
+
+def start(executor, images: list[str]):
+    """Start pulling *images* unless the same pull was already started.
+
+    A pull of other images is cancelled first, so only one thread ever
+    updates the progress state.
+    """
+    global _images, _thread, _layers, _failed
+    if images == _images:
+        return
+    cancel()
+    _images, _layers, _failed = list(images), {}, []
+    _thread = threading.Thread(target=_pull, args=(executor, _images), daemon=True)
+    _thread.start()
+    info(t("common.prepull_started", images=", ".join(images)))
+
+
+def cancel():
+    """Stop the background pull, if any, and forget it."""
+    global _images, _thread, _stream
+    if _thread is None:
+        return
+    _cancelled.set()
+    if _stream is not None:
+        _stream.abort()
+    _thread.join()
+    _images, _thread, _stream = [], None, None
+    _cancelled.clear()
+
+
+def finish():
+    """Wait for the background pull, with a progress bar while it runs."""
+    if _thread is None:
+        return
+    if _thread.is_alive():
+        message = t("common.prepull_waiting")
+        with Progress(
+            SpinnerColumn("dots", style=f"bold {ACCENT}"),
+            TextColumn(f"[bold white]{message}[/]"),
+            BarColumn(bar_width=20, style=MUTED, complete_style=ACCENT, finished_style=OK),
+            TaskProgressColumn(),
+            TimeElapsedColumn(),
+            console=console,
+            transient=True,
+        ) as bar:
+            task = bar.add_task(message, total=None)
+            while _thread.is_alive():
+                if _layers:
+                    bar.update(task, total=len(_layers), completed=sum(list(_layers.values())))
+                time.sleep(0.2)
+    if _failed:
+        info(t("common.prepull_failed", images=", ".join(_failed)))
+    else:
+        ok(t("common.prepull_done", images=", ".join(_images)))
@@ -0,0 +1,158 @@
+"""Long-lived shell session inside a Docker Compose service.
+
+Every ``docker compose exec`` pays for compose project parsing, exec
+setup and a fresh process start.  BackendSession keeps one ``bash``
+running in the service and feeds it commands over stdin instead; a
+sentinel line carrying the exit code marks the end of each command's
+output.  If the session dies, commands fall back to one-shot exec.
+"""
+
+import shlex
+import sys
+import uuid
+
+from . import trace
+from .ssh import CommandPlan
+from .stream import DEFAULT_TAIL, OutputStream
+
+
+class BackendSession:
+    """Run shell commands in a persistent bash inside a compose service.
+
+    Offers the same ``run(cmd, capture)``, ``stream()`` and ``plan()``
+    interface as the executors, so callers can swap ``executor.run(f"{compose_cmd} exec -T
+    backend {cmd}")`` for ``session.run(cmd)``.
+    """
+
+    def __init__(self, executor, compose_cmd: str, service: str = "backend"):
+        self.executor = executor
+        self.exec_prefix = f"{compose_cmd} exec -T {service}"
+        self.host_label = f"{getattr(executor, 'host_label', 'local')}:{service}"
+        self._proc = None
+        self._broken = False
+        self._marker = f"@@session-{uuid.uuid4().hex}"
+
+    def _alive(self) -> bool:
+        if self._broken:
+            return False
+        if self._proc is None:
+            try:
+                self._proc = self.executor.spawn(f"{self.exec_prefix} bash --noprofile --norc")
+            except OSError:
+                self._mark_broken()
+                return False
+        if self._proc.poll() is not None:
+            self._mark_broken()
+            return False
+        return True
+
+    def _mark_broken(self):
+        from .ui import info
+        from .i18n import t
+        if not self._broken:
+            info(t("common.session_fallback"))
+        self._broken = True
+        self._proc = None
+
+    def _oneshot_cmd(self, cmd: str) -> str:
+        return f"{self.exec_prefix} bash -c {shlex.quote(cmd)}"
+
+    def _send(self, cmd: str) -> bool:
+        """Start *cmd* in the session; False if the session is unusable."""
+        if not self._alive():
+            return False
+        try:
+            self._proc.stdin.write(
+                f"( {cmd}\n) </dev/null 2>&1; printf '\\n{self._marker} %d\\n' \"$?\"\n"
+            )
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._mark_broken()
+            return False
+        return True
+
+    def _read_output(self):
+        """Yield the output lines of the command just sent.
+
+        Sets ``self._code`` when the sentinel arrives; it stays None if
+        the session died first.
+        """
+        self._code = None
+        pending_blank = False
+        for line in self._proc.stdout:
+            if line.startswith(self._marker + " "):
+                self._code = int(line.split()[1])
+                return
+            # The sentinel printf starts with a newline; hold back one blank
+            # line until we know it is not that separator.
+            if pending_blank:
+                yield "\n"
+                pending_blank = False
+            if line == "\n":
+                pending_blank = True
+                continue
+            yield line
+        # EOF without a sentinel: the session died under this command.
+        self._mark_broken()
+
+    def run(self, cmd: str, capture: bool = False) -> int | tuple[int, str, str]:
+        """Run *cmd* in the session.
+
+        Returns (returncode, output, "") if capture=True (stderr is merged
+        into output), else returncode with output echoed to the terminal.
+        """
+        if not self._send(cmd):
+            return self.executor.run(self._oneshot_cmd(cmd), capture=capture)
+
+        span = trace.begin("session", cmd, self.host_label)
+        lines: list[str] = []
+        nbytes = 0
+        started = False
+        for line in self._read_output():
+            started = True
+            nbytes += len(line)
+            if capture:
+                lines.append(line)
+            else:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+
+        code = self._code
+        if code is None:
+            if not started:
+                return self.executor.run(self._oneshot_cmd(cmd), capture=capture)
+            code = 255
+        span.finish(code, nbytes)
+        return (code, "".join(lines), "") if capture else code
+
+    def stream(self, cmd: str, tail: int = DEFAULT_TAIL, parsers=()) -> OutputStream:
+        """Run *cmd* in the session and iterate over its output line by line.
+
+        Leaving the stream early drains the rest of the command's output,
+        since the shared shell cannot be interrupted mid-command.
+        """
+        if not self._send(cmd):
+            return self.executor.stream(self._oneshot_cmd(cmd), tail=tail, parsers=parsers)
+        span = trace.begin("session-stream", cmd, self.host_label)
+        return OutputStream(
+            self._read_output(),
+            finish=lambda: 255 if self._code is None else self._code,
+            tail=tail, parsers=parsers,
+            on_finish=lambda out: span.finish(out.returncode, out.byte_count),
+        )
+
+    def plan(self) -> CommandPlan:
+        """Start a batch of commands that run as one script in the session."""
+        return CommandPlan(self)
+
+    def close(self):
+        """End the session's shell."""
+        proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.write("exit\n")
+            proc.stdin.close()
+            proc.wait(timeout=10)
+        except Exception:
+            proc.kill()
@@ -0,0 +1,221 @@
+"""Golden-snapshot cache of freshly installed sites.
+
+After a successful install the wizard can keep a compressed database dump
+of the primary site together with the fetched apps, ``sites/apps.txt`` and
+the built assets.  A later setup with the same ERPNext version, database
+type and app selection restores from that snapshot instead of running
+``bench new-site`` and every ``install-app`` again.
+
+Snapshots live on the Docker host (local or over SSH) under
+``~/.cache/erpnext-setup-wizard/snapshots/<key>/``.  A directory's mtime is
+its last use, so the cache is pruned least-recently-used first.
+"""
+
+import hashlib
+import json
+import shlex
+import time
+import urllib.parse
+from typing import NamedTuple
+
+from . import trace
+
+# Shell fragment, expanded on the Docker host
+CACHE_ROOT = '"$HOME"/.cache/erpnext-setup-wizard/snapshots'
+DEFAULT_MAX_MB = 4096
+
+# Scratch directory inside the backend container
+_WORK_DIR = "/tmp/wizard-snapshot"
+_BENCH_DIR = "/home/frappe/frappe-bench"
+_ENTRY = "@@snapshot "
+_KEY_FILE = "encryption_key"
+
+
+class Snapshot(NamedTuple):
+    """A cached snapshot as listed on the Docker host."""
+    key: str
+    size_kb: int
+    meta: dict
+
+
+def _strip_credentials(source: str) -> str:
+    """*source* without a user:token@ part, which private app URLs may carry."""
+    parts = urllib.parse.urlsplit(source)
+    if not parts.netloc or "@" not in parts.netloc:
+        return source
+    return urllib.parse.urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def snapshot_key(cfg, apps: list[tuple[str, str, str]]) -> tuple[str, dict]:
+    """Cache key and metadata for an install of *apps* on *cfg*'s version.
+
+    *apps* holds (repo_name, source, branch) for every app besides ERPNext,
+    in install order.  Returns (key, meta).  The key covers each source
+    only as a hash, and meta (stored in plain text) gets the sources with
+    any credentials removed.
+    """
+    keyed = {
+        "erpnext_version": cfg.erpnext_version,
+        "db_type": cfg.db_type,
+        "apps": [{"name": name, "source": _sha256(source), "branch": branch}
+                 for name, source, branch in apps],
+    }
+    meta = dict(keyed, apps=[
+        {"name": name, "source": _strip_credentials(source), "branch": branch}
+        for name, source, branch in apps
+    ])
+    return _sha256(json.dumps(keyed, sort_keys=True))[:16], meta
+
+
+def _dir(key: str) -> str:
+    return f"{CACHE_ROOT}/{shlex.quote(key)}"
+
+
+def list_snapshots(executor) -> list[Snapshot]:
+    """Snapshots on the Docker host, most recently used first."""
+    script = (
+        f'cd {CACHE_ROOT} 2>/dev/null || exit 0; '
+        f'for d in $(ls -1t); do '
+        f'case "$d" in *.tmp) continue;; esac; '
+        f'[ -f "$d/meta.json" ] || continue; '
+        f'printf "{_ENTRY}%s %s\\n" "$d" "$(du -sk "$d" | cut -f1)"; '
+        f'cat "$d/meta.json"; echo; '
+        f'done'
+    )
+    code, out, _ = executor.run(script, capture=True)
+    if code != 0:
+        return []
+
+    snapshots = []
+    lines = out.splitlines()
+    for i, line in enumerate(lines):
+        if not line.startswith(_ENTRY) or i + 1 >= len(lines):
+            continue
+        try:
+            key, size = line[len(_ENTRY):].split()
+            snapshots.append(Snapshot(key, int(size), json.loads(lines[i + 1])))
+        except ValueError:
+            continue
+    return snapshots
+
+
+def find(executor, key: str) -> Snapshot | None:
+    """The cached snapshot for *key*, or None."""
+    for snap in list_snapshots(executor):
+        if snap.key == key:
+            return snap
+    return None
+
+
+def remove(executor, keys: list[str]) -> bool:
+    """Delete the given snapshots from the Docker host."""
+    if not keys:
+        return True
+    return executor.run(
+        "rm -rf " + " ".join(_dir(key) for key in keys), capture=True,
+    )[0] == 0
+
+
+def prune(executor, max_mb: int) -> list[Snapshot]:
+    """Drop least-recently-used snapshots until the cache fits in *max_mb*.
+
+    Returns the snapshots that were removed.
+    """
+    snapshots = list_snapshots(executor)
+    budget = max_mb * 1024
+    used = 0
+    evict = []
+    for snap in snapshots:
+        used += snap.size_kb
+        if used > budget:
+            evict.append(snap)
+    if evict and not remove(executor, [snap.key for snap in evict]):
+        return []
+    return evict
+
+
+def save(executor, backend, compose_cmd: str, site_name: str,
+         key: str, meta: dict, app_names: list[str]) -> bool:
+    """Store *site_name*'s database, apps and assets as snapshot *key*."""
+    site_q = shlex.quote(site_name)
+    work_q = shlex.quote(_WORK_DIR)
+    paths = " ".join(shlex.quote(f"apps/{name}") for name in app_names)
+
+    plan = backend.plan()
+    plan.add(f"rm -rf {work_q} && mkdir -p {work_q}")
+    plan.add(f"bench --site {site_q} backup --backup-path {work_q}")
+    plan.add(f"mv {work_q}/*-database.sql.gz {work_q}/database.sql.gz")
+    plan.add(f"tar -czf {work_q}/files.tar.gz -C {_BENCH_DIR} "
+             f"sites/apps.txt sites/assets {paths}")
+    plan.add(f"cat sites/{site_q}/site_config.json")
+    results = plan.run(stop_on_error=True)
+    if len(results) != len(plan) or not all(r.ok for r in results):
+        backend.run(f"rm -rf {work_q}", capture=True)
+        return False
+
+    try:
+        site_config = json.loads(results[-1].output)
+    except ValueError:
+        site_config = {}
+    encryption_key = site_config.get("encryption_key", "")
+    trace.add_secrets(encryption_key)
+    meta = dict(meta, created=time.strftime("%Y-%m-%d %H:%M:%S"))
+
+    # Copy out to a temporary directory, then move into place in one step
+    tmp = f"{_dir(key)}.tmp"
+    plan = executor.plan()
+    plan.add(f"rm -rf {tmp} && (umask 077 && mkdir -p {tmp})")
+    plan.add(f"{compose_cmd} cp backend:{_WORK_DIR}/database.sql.gz {tmp}/")
+    plan.add(f"{compose_cmd} cp backend:{_WORK_DIR}/files.tar.gz {tmp}/")
+    plan.add(f"printf '%s\\n' {shlex.quote(json.dumps(meta))} > {tmp}/meta.json")
+    # Kept apart from meta.json, which ``cache list`` reads
+    plan.add(f"printf '%s' {shlex.quote(encryption_key)} > {tmp}/{_KEY_FILE}")
+    plan.add(f"rm -rf {_dir(key)} && mv {tmp} {_dir(key)}")
+    results = plan.run(stop_on_error=True)
+    backend.run(f"rm -rf {work_q}", capture=True)
+    if len(results) != len(plan) or not all(r.ok for r in results):
+        executor.run(f"rm -rf {tmp}", capture=True)
+        return False
+    return True
+
+
+def unpack(executor, backend, compose_cmd: str, snap: Snapshot) -> dict | None:
+    """Put snapshot *snap*'s apps and assets in place inside the backend.
+
+    Returns a template ({"sql": path, "encryption_key": key}) to restore the
+    site database from, or None on failure.  Marks the snapshot as used.
+    """
+    work_q = shlex.quote(_WORK_DIR)
+    if backend.run(f"rm -rf {work_q} && mkdir -p {work_q}", capture=True)[0] != 0:
+        return None
+
+    plan = executor.plan()
+    plan.add(f"{compose_cmd} cp {_dir(snap.key)}/database.sql.gz backend:{_WORK_DIR}/")
+    plan.add(f"{compose_cmd} cp {_dir(snap.key)}/files.tar.gz backend:{_WORK_DIR}/")
+    plan.add(f"cat {_dir(snap.key)}/{_KEY_FILE}")
+    plan.add(f"touch {_dir(snap.key)}")
+    results = plan.run(stop_on_error=True)
+    if len(results) != len(plan) or not all(r.ok for r in results):
+        return None
+    encryption_key = results[2].output
+
+    plan = backend.plan()
+    plan.add(f"tar -xzf {work_q}/files.tar.gz -C {_BENCH_DIR}")
+    plan.add(f"gunzip -c {work_q}/database.sql.gz > {work_q}/database.sql")
+    # bench get-app did this when the snapshot was taken; env/ is not a volume
+    for app in snap.meta.get("apps", []):
+        plan.add(f"pip install -e {shlex.quote('apps/' + app['name'])}")
+    results = plan.run(stop_on_error=True)
+    if len(results) != len(plan) or not all(r.ok for r in results):
+        return None
+    trace.add_secrets(encryption_key)
+    return {"sql": f"{_WORK_DIR}/database.sql", "encryption_key": encryption_key}
+
+
+def cleanup(backend):
+    """Remove the scratch directory inside the backend container."""
+    backend.run(f"rm -rf {shlex.quote(_WORK_DIR)}", capture=True)
@@ -2,49 +2,257 @@
 
 Provides LocalExecutor and SSHExecutor with the same interface so that
 step functions can run commands identically on the local machine or a
-remote server.
+remote server.  AsyncLocalExecutor and AsyncSSHExecutor are asyncio
+counterparts whose ``run_many`` overlaps independent commands.
+
+SSHExecutor multiplexes every ssh/scp call over a single master
+connection per host (OpenSSH ControlMaster), so only the first call pays
+for the TCP + key exchange + auth handshake.
 """
 
+import abc
+import asyncio
+import atexit
+import os
+import platform
+import shlex
+import shutil
+import signal
 import subprocess
+import tempfile
+import uuid
+import weakref
+from typing import NamedTuple
+
+from . import trace
+from .stream import DEFAULT_TAIL, OutputStream
+
+# Seconds an idle master connection outlives its last client.  This is only
+# a safety net for crashes; close() tears the master down explicitly.
+_CONTROL_PERSIST = 600
+
+_control_dir: str | None = None
+_open_executors: "weakref.WeakSet[SSHExecutor]" = weakref.WeakSet()
+
+
+def _get_control_dir() -> str:
+    """Return the private (0700) directory holding SSH control sockets.
+
+    Prefers /tmp because socket paths are limited to ~104 bytes and the
+    default temp dir on macOS is already long.
+    """
+    global _control_dir
+    if _control_dir is None:
+        base = "/tmp" if os.path.isdir("/tmp") else None
+        _control_dir = tempfile.mkdtemp(prefix="ewz-ssh-", dir=base)
+    return _control_dir
+
+
+def _close_all():
+    """Tear down every open master connection (registered with atexit)."""
+    for executor in list(_open_executors):
+        executor.close()
+    if _control_dir is not None:
+        shutil.rmtree(_control_dir, ignore_errors=True)
+
+
+atexit.register(_close_all)
+
+
+def _nbytes(text: str) -> int:
+    return len(text.encode(errors="replace"))
+
+
+def _stream_process(proc: subprocess.Popen, tail: int, parsers, span) -> OutputStream:
+    """Wrap a spawned process (stdin closed) in an OutputStream."""
+    proc.stdin.close()
+    return OutputStream(proc.stdout, finish=proc.wait, abort=proc.kill,
+                        tail=tail, parsers=parsers,
+                        on_finish=lambda out: span.finish(out.returncode, out.byte_count))
+
+
+def _run_process(argv, span, capture: bool, **kwargs) -> int | tuple[int, str, str]:
+    """subprocess.run with the (returncode[, stdout, stderr]) executor contract."""
+    if capture:
+        result = subprocess.run(argv, capture_output=True, text=True, **kwargs)
+        span.finish(result.returncode, _nbytes(result.stdout), _nbytes(result.stderr))
+        return result.returncode, result.stdout, result.stderr
+    result = subprocess.run(argv, **kwargs)
+    span.finish(result.returncode)
+    return result.returncode
+
+
+class PlanResult(NamedTuple):
+    """Outcome of one command in a CommandPlan (stdout and stderr merged)."""
+    cmd: str
+    code: int
+    output: str
+
+    @property
+    def ok(self) -> bool:
+        return self.code == 0
+
+
+class CommandPlan:
+    """A sequence of commands shipped to an executor as one shell script.
+
+    Each command runs in its own subshell with stdin closed and stderr
+    merged into stdout; a marker line carrying its exit code follows its
+    output so the combined stream can be split back into per-command
+    results.  With *wrap* (e.g. ``docker compose exec -T backend``) the
+    whole script runs inside that context, so N commands cost a single
+    SSH round trip and a single container exec.
+    """
+
+    def __init__(self, executor, wrap: str = ""):
+        self.executor = executor
+        self.wrap = wrap
+        self.commands: list[str] = []
+        self._marker = f"@@plan-{uuid.uuid4().hex}"
+
+    def add(self, cmd: str) -> "CommandPlan":
+        """Append a command; returns self so calls can be chained."""
+        self.commands.append(cmd)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def _script(self, stop_on_error: bool) -> str:
+        lines = []
+        for i, cmd in enumerate(self.commands):
+            lines.append(f"( {cmd}\n) </dev/null 2>&1; rc=$?")
+            lines.append(f"printf '\\n{self._marker} {i} %d\\n' \"$rc\"")
+            if stop_on_error:
+                lines.append('[ "$rc" -eq 0 ] || exit 0')
+        return "\n".join(lines)
+
+    def run(self, stop_on_error: bool = False) -> list[PlanResult]:
+        """Run every command in one invocation and return per-command results.
+
+        With *stop_on_error*, commands after the first failure are not run
+        and are missing from the result list.  If the invocation itself
+        fails before a command reports back (SSH or exec error), that
+        command is reported with the invocation's exit code.
+        """
+        if not self.commands:
+            return []
+        script = shlex.quote(self._script(stop_on_error))
+        cmd = f"{self.wrap} sh -c {script}" if self.wrap else f"sh -c {script}"
+        code, stdout, stderr = self.executor.run(cmd, capture=True)
+
+        results: list[PlanResult] = []
+        chunk: list[str] = []
+        for line in stdout.split("\n"):
+            if line.startswith(self._marker + " "):
+                _, index, rc = line.split(" ")
+                # Drop the newline the marker printf prepends
+                if chunk and chunk[-1] == "":
+                    chunk.pop()
+                results.append(PlanResult(self.commands[int(index)], int(rc), "\n".join(chunk)))
+                chunk = []
+            else:
+                chunk.append(line)
+
+        if len(results) < len(self.commands) and (code != 0 or not stop_on_error):
+            failed = self.commands[len(results)]
+            output = "\n".join(chunk).strip() + stderr
+            results.append(PlanResult(failed, code or 1, output))
+        return results
 
 
 class LocalExecutor:
     """Execute commands on the local machine via subprocess."""
 
+    host_label = "local"
+
     def run(self, cmd: str, capture: bool = False) -> int | tuple[int, str, str]:
         """Run a shell command locally.
 
         Returns (returncode, stdout, stderr) if capture=True, else returncode.
         """
-        if capture:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            return result.returncode, result.stdout, result.stderr
-        else:
-            result = subprocess.run(cmd, shell=True)
-            return result.returncode
+        span = trace.begin("run", cmd, self.host_label)
+        return _run_process(cmd, span, capture, shell=True)
+
+    def spawn(self, cmd: str) -> subprocess.Popen:
+        """Start a long-running shell command with piped stdin and stdout.
+
+        stderr is merged into stdout; both pipes are line-buffered text.
+        """
+        return subprocess.Popen(
+            cmd, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1,
+        )
+
+    def stream(self, cmd: str, tail: int = DEFAULT_TAIL, parsers=()) -> OutputStream:
+        """Run a command and iterate over its merged output line by line.
+
+        Only the last *tail* lines are retained (``OutputStream.tail``).
+        """
+        span = trace.begin("stream", cmd, self.host_label)
+        return _stream_process(self.spawn(cmd), tail, parsers, span)
 
     def upload(self, local_path: str, remote_path: str):
         """Copy a file locally (local-to-local)."""
-        import shutil
-
+        span = trace.begin("upload", f"{local_path} -> {remote_path}", self.host_label)
         shutil.copy2(local_path, remote_path)
+        span.finish(0)
 
+    def plan(self, wrap: str = "") -> CommandPlan:
+        """Start a batch of commands that run in a single invocation."""
+        return CommandPlan(self, wrap)
 
-class SSHExecutor:
-    """Execute commands on a remote server via SSH."""
+    def close(self):
+        """No-op; present for interface parity with SSHExecutor."""
 
-    def __init__(self, host: str, user: str, port: int = 22, key_path: str = ""):
+
+class _SSHConnection:
+    """SSH connection options and master-connection lifecycle.
+
+    The first call opens a master connection; later ssh/scp calls reuse it
+    through a control socket.  ``handshakes_saved`` counts the calls that
+    did not need a handshake of their own.  Multiplexing is disabled on
+    Windows, whose OpenSSH port does not support ControlMaster.  With
+    *batch*, ssh never prompts (for work running behind other prompts).
+    """
+
+    def __init__(self, host: str, user: str, port: int = 22, key_path: str = "",
+                 multiplex: bool = True, batch: bool = False):
         self.host = host
         self.user = user
         self.port = port
         self.key_path = key_path
+        self.multiplex = multiplex and platform.system() != "Windows"
+        self.batch = batch
+        self.calls = 0
+        self.handshakes_saved = 0
+        self._master_open = False
+
+    @property
+    def _destination(self) -> str:
+        return f"{self.user}@{self.host}"
+
+    @property
+    def host_label(self) -> str:
+        return self._destination
+
+    def _control_opts(self) -> list[str]:
+        """Options that attach a client to the master connection."""
+        if not self.multiplex:
+            return []
+        path = os.path.join(_get_control_dir(), "%C")
+        return ["-o", "ControlMaster=auto", "-o", f"ControlPath={path}",
+                "-o", f"ControlPersist={_CONTROL_PERSIST}"]
 
     def _ssh_base(self) -> list[str]:
         """Build the base ssh command with connection options."""
         parts = ["ssh", "-o", "StrictHostKeyChecking=accept-new", "-p", str(self.port)]
+        if self.batch:
+            parts.extend(["-o", "BatchMode=yes"])
         if self.key_path:
             parts.extend(["-i", self.key_path])
-        parts.append(f"{self.user}@{self.host}")
+        parts.extend(self._control_opts())
+        parts.append(self._destination)
         return parts
 
     def _scp_base(self) -> list[str]:
@@ -52,47 +260,248 @@ class SSHExecutor:
         parts = ["scp", "-o", "StrictHostKeyChecking=accept-new", "-P", str(self.port)]
         if self.key_path:
             parts.extend(["-i", self.key_path])
+        parts.extend(self._control_opts())
         return parts
 
+    def _master_alive(self) -> bool:
+        """Ask the control socket whether the master is still running."""
+        check = self._ssh_base()
+        check[1:1] = ["-O", "check"]
+        result = subprocess.run(check, capture_output=True)
+        return result.returncode == 0
+
+    def _ensure_master(self):
+        """Open the master connection on first use and count reuse after."""
+        self.calls += 1
+        if not self.multiplex:
+            return
+        if self._master_open:
+            self.handshakes_saved += 1
+            return
+        if self._master_alive():
+            # Another executor for the same host already opened it
+            self._master_open = True
+            _open_executors.add(self)
+            self.handshakes_saved += 1
+            return
+        # -f backgrounds only after authentication, so password/passphrase
+        # prompts still reach the terminal.  -N: no remote command.
+        master = self._ssh_base()
+        master[1:1] = ["-f", "-N", "-o", "ControlMaster=yes"]
+        result = subprocess.run(master, stdin=subprocess.DEVNULL)
+        if result.returncode == 0 and self._master_alive():
+            self._master_open = True
+            _open_executors.add(self)
+        else:
+            # Connect per call; the real command will surface the error.
+            self.multiplex = False
+
+    def close(self):
+        """Tear down the master connection, if one is open."""
+        if not self._master_open:
+            return
+        self._master_open = False
+        _open_executors.discard(self)
+        stop = self._ssh_base()
+        stop[1:1] = ["-O", "exit"]
+        subprocess.run(stop, capture_output=True)
+
+
+class SSHExecutor(_SSHConnection):
+    """Execute commands on a remote server via SSH."""
+
     def run(self, cmd: str, capture: bool = False) -> int | tuple[int, str, str]:
         """Run a command on the remote server via SSH.
 
         Returns (returncode, stdout, stderr) if capture=True, else returncode.
         """
-        full_cmd = self._ssh_base() + [cmd]
-        if capture:
-            result = subprocess.run(full_cmd, capture_output=True, text=True)
-            return result.returncode, result.stdout, result.stderr
-        else:
-            result = subprocess.run(full_cmd)
-            return result.returncode
+        self._ensure_master()
+        span = trace.begin("run", cmd, self.host_label)
+        return _run_process(self._ssh_base() + [cmd], span, capture)
+
+    def spawn(self, cmd: str) -> subprocess.Popen:
+        """Start a long-running remote command with piped stdin and stdout.
+
+        stderr is merged into stdout; both pipes are line-buffered text.
+        """
+        self._ensure_master()
+        return subprocess.Popen(
+            self._ssh_base() + [cmd], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1,
+        )
+
+    def stream(self, cmd: str, tail: int = DEFAULT_TAIL, parsers=()) -> OutputStream:
+        """Run a command and iterate over its merged output line by line.
+
+        Only the last *tail* lines are retained (``OutputStream.tail``).
+        """
+        proc = self.spawn(cmd)
+        span = trace.begin("stream", cmd, self.host_label)
+        return _stream_process(proc, tail, parsers, span)
 
     def upload(self, local_path: str, remote_path: str):
         """Upload a file to the remote server via SCP."""
-        dest = f"{self.user}@{self.host}:{remote_path}"
+        self._ensure_master()
+        dest = f"{self._destination}:{remote_path}"
         full_cmd = self._scp_base() + [local_path, dest]
+        span = trace.begin("upload", f"{local_path} -> {remote_path}", self.host_label)
         result = subprocess.run(full_cmd)
+        span.finish(result.returncode)
         if result.returncode != 0:
             raise RuntimeError(f"SCP upload failed: {local_path} -> {dest}")
 
+    def plan(self, wrap: str = "") -> CommandPlan:
+        """Start a batch of commands that run in a single SSH round trip."""
+        return CommandPlan(self, wrap)
+
     def test_connection(self) -> bool:
         """Test whether the SSH connection works."""
         code, _, _ = self.run("echo ok", capture=True)
         return code == 0
 
 
-def create_executor(cfg) -> LocalExecutor | SSHExecutor:
+# Exit code reported for commands killed by a run timeout (as coreutils timeout)
+TIMEOUT_EXIT_CODE = 124
+
+
+_POSIX = os.name == "posix"
+
+
+def _kill_tree(proc):
+    """Kill an asyncio subprocess and, on POSIX, its whole process group."""
+    if proc.returncode is not None:
+        return
+    try:
+        if _POSIX:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+class _AsyncRunner(abc.ABC):
+    """asyncio ``run``/``run_many`` shared by the async executors.
+
+    Subclasses provide ``_argv(cmd)``, the argument vector that runs a
+    shell command string.  stdin is always /dev/null so concurrent
+    commands never compete for the terminal.
+    """
+
+    @abc.abstractmethod
+    async def _argv(self, cmd: str) -> list[str]:
+        """Argument vector that runs the shell command *cmd*."""
+
+    async def run(self, cmd: str, capture: bool = False,
+                  timeout: float | None = None) -> int | tuple[int, str, str]:
+        """Run a command without blocking the event loop.
+
+        Returns (returncode, stdout, stderr) if capture=True, else returncode.
+        A command still running after *timeout* seconds is killed and
+        reported with TIMEOUT_EXIT_CODE.  Cancelling the awaiting task
+        (e.g. Ctrl-C under asyncio.run) kills the process too.
+        """
+        pipe = asyncio.subprocess.PIPE if capture else None
+        argv = await self._argv(cmd)
+        span = trace.begin("run", cmd, self.host_label)
+        # Own process group, so a kill also reaches the shell's children
+        # (otherwise they keep the pipes open and the wait never ends).
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL, stdout=pipe, stderr=pipe,
+            start_new_session=_POSIX,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            code = proc.returncode
+        except asyncio.TimeoutError:
+            _kill_tree(proc)
+            await proc.wait()
+            stdout, stderr = b"", f"timed out after {timeout}s".encode()
+            code = TIMEOUT_EXIT_CODE
+        except asyncio.CancelledError:
+            _kill_tree(proc)
+            span.finish(None)
+            raise
+        if capture:
+            span.finish(code, len(stdout), len(stderr))
+            return (code, stdout.decode(errors="replace"),
+                    stderr.decode(errors="replace"))
+        span.finish(code)
+        return code
+
+    async def run_many(self, cmds: list[str], limit: int = 4, capture: bool = True,
+                       timeout: float | None = None) -> list:
+        """Run *cmds* with at most *limit* in flight; results keep input order."""
+        semaphore = asyncio.Semaphore(max(1, limit))
+
+        async def _one(cmd: str):
+            async with semaphore:
+                return await self.run(cmd, capture=capture, timeout=timeout)
+
+        return await asyncio.gather(*(_one(cmd) for cmd in cmds))
+
+
+class AsyncLocalExecutor(_AsyncRunner):
+    """Execute commands on the local machine via asyncio subprocesses."""
+
+    host_label = "local"
+
+    async def _argv(self, cmd: str) -> list[str]:
+        if platform.system() == "Windows":
+            return ["cmd", "/c", cmd]
+        return ["/bin/sh", "-c", cmd]
+
+    def close(self):
+        """No-op; present for interface parity with AsyncSSHExecutor."""
+
+
+class AsyncSSHExecutor(_AsyncRunner, _SSHConnection):
+    """Execute commands on a remote server via asyncio-driven SSH.
+
+    Shares the per-host master connection with SSHExecutor.  The master
+    is opened by the first command on a worker thread, and the other
+    commands of a concurrent burst wait for it, so the burst pays for one
+    handshake rather than one each.
+    """
+
+    _master_lock: asyncio.Lock | None = None
+    _lock_loop: asyncio.AbstractEventLoop | None = None
+
+    async def _argv(self, cmd: str) -> list[str]:
+        # One lock per event loop: each asyncio.run() starts a new one
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._master_lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._master_lock:
+            await asyncio.to_thread(self._ensure_master)
+        return self._ssh_base() + [cmd]
+
+
+def create_executor(cfg, asynchronous: bool = False):
     """Create the appropriate executor based on deploy_mode in the config.
 
     Args:
         cfg: A Config dataclass with deploy_mode, ssh_host, ssh_user,
              ssh_port, and ssh_key_path fields.
+        asynchronous: Return AsyncLocalExecutor/AsyncSSHExecutor instead
+             of the blocking LocalExecutor/SSHExecutor.
     """
     if cfg.deploy_mode == "remote":
-        return SSHExecutor(
+        cls = AsyncSSHExecutor if asynchronous else SSHExecutor
+        return cls(
             host=cfg.ssh_host,
             user=cfg.ssh_user,
             port=cfg.ssh_port,
             key_path=cfg.ssh_key_path,
         )
-    return LocalExecutor()
+    return AsyncLocalExecutor() if asynchronous else LocalExecutor()
+
+
+def report_connection_reuse(executor):
+    """Print how many SSH handshakes connection multiplexing saved."""
+    saved = getattr(executor, "handshakes_saved", 0)
+    if not saved:
+        return
+    from .ui import info
+    from .i18n import t
+    info(t("common.ssh_handshakes_saved", saved=saved, total=executor.calls))
@@ -2,21 +2,29 @@
 
 import re
 import sys
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 
 from rich.panel import Panel
+from rich.progress import (
+    Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn,
+)
 from rich.table import Table
 from rich.align import Align
 from rich.rule import Rule
 from rich import box
 
-from ..theme import console, ACCENT, HEADING, WARN, MUTED
-from ..ui import step_header, step, ok, fail
+from ..theme import console, ACCENT, HEADING, WARN, MUTED, OK
+from ..ui import step_header, ok, fail
 from ..prompts import ask_field, ask_password_field, ask_version_field, ask_apps_field, ask_select_field, confirm_action
 from ..apps import OPTIONAL_APPS
-from ..community_apps import CommunityApp, fetch_community_apps
+from ..community_apps import CommunityApp, IndexProgress, compatible_apps, fetch_community_index
 from ..i18n import t
 from ..versions import fetch_erpnext_versions
+from ..ssh import LocalExecutor, SSHExecutor
+from .. import prepull
 from . import TOTAL_STEPS
 
 
@@ -35,6 +43,11 @@ class Config:
     community_apps: list[CommunityApp] = field(default_factory=list)
     custom_apps: list[dict] = field(default_factory=list)
     extra_sites: list[dict] = field(default_factory=list)
+    site_concurrency: int = 2  # extra sites created/installed in parallel
+    fetch_concurrency: int = 4  # app repos cloned in parallel
+    extra_sites_strategy: str = "install"  # "install" or "clone" (copy of the first site)
+    snapshot_cache: bool = False  # restore/save golden snapshots of the installed site
+    snapshot_cache_max_mb: int = 4096
 
     # Production + Remote
     domain: str = ""
@@ -104,10 +117,73 @@ def _validate_email(val: str) -> bool | str:
     return t("steps.configure.email_invalid")
 
 
+def _start_prepull(deploy_mode: str, ssh_host: str, ssh_user: str, ssh_port: int,
+                   ssh_key_path: str, erpnext_version: str):
+    """Start pulling the ERPNext image while the remaining prompts run."""
+    if deploy_mode == "remote":
+        executor = SSHExecutor(ssh_host, ssh_user, ssh_port, ssh_key_path, batch=True)
+    else:
+        executor = LocalExecutor()
+    prepull.start(executor, [f"frappe/erpnext:{erpnext_version}"])
+
+
+def _in_background(fn, *args) -> Future:
+    """Run ``fn(*args)`` on a daemon thread; the Future carries its result.
+
+    Unlike a ThreadPoolExecutor worker, a daemon thread is not joined at
+    exit, so quitting during the prompts does not wait for the fetch.
+    """
+    future: Future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _join(future: Future, message: str, progress=None):
+    """Result of a background fetch, behind a spinner only if still running.
+
+    With *progress* (``current``/``total`` counters), a bar shows how far
+    the fetch has got.
+    """
+    if future.done():
+        return future.result()
+    if progress is None:
+        with console.status(f"[bold white]{message}[/]", spinner="dots",
+                            spinner_style=f"bold {ACCENT}"):
+            return future.result()
+    with Progress(
+        SpinnerColumn("dots", style=f"bold {ACCENT}"),
+        TextColumn(f"[bold white]{message}[/]"),
+        BarColumn(bar_width=20, style=MUTED, complete_style=ACCENT, finished_style=OK),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+    ) as bar:
+        task = bar.add_task(message, total=None)
+        while not future.done():
+            if progress.total:
+                bar.update(task, total=progress.total, completed=progress.current)
+            time.sleep(0.1)
+    return future.result()
+
+
 def run_configure() -> Config:
     """Prompt for configuration and return a Config dataclass."""
     step_header(2, TOTAL_STEPS, t("steps.configure.title"))
 
+    # Neither fetch needs an answer, so both run while the first prompts do
+    versions_future = _in_background(fetch_erpnext_versions)
+    community_progress = IndexProgress()
+    community_future = _in_background(fetch_community_index, community_progress)
+
     while True:
         console.print(
             Panel(
@@ -197,8 +273,7 @@ def run_configure() -> Config:
         n += 1
 
         # ── 4. ERPNext version ───────────────────────────────
-        step(t("steps.configure.fetching_versions"))
-        versions = fetch_erpnext_versions()
+        versions = _join(versions_future, t("steps.configure.fetching_versions"))
 
         if versions:
             ok(t("steps.configure.versions_loaded", count=len(versions)))
@@ -219,6 +294,8 @@ def run_configure() -> Config:
             default=default_version,
         )
         n += 1
+        _start_prepull(deploy_mode, ssh_host, ssh_user, ssh_port_val, ssh_key_path,
+                       erpnext_version)
 
         # ── 5. DB type ───────────────────────────────────────
         db_type = ask_select_field(
@@ -305,8 +382,9 @@ def run_configure() -> Config:
 
         # ── Community apps ───────────────────────────────────
         console.print()
-        step(t("steps.configure.fetching_community_apps"))
-        community_app_list = fetch_community_apps(erpnext_version)
+        community_index = _join(community_future, t("steps.configure.fetching_community_apps"),
+                                community_progress)
+        community_app_list = compatible_apps(community_index, erpnext_version)
 
         community_apps: list[CommunityApp] = []
         if community_app_list:
@@ -503,6 +581,8 @@ def run_configure() -> Config:
         if deploy_mode != "local":
             if confirm_action(t("steps.configure.build_image_prompt")):
                 build_image = True
+                # images/custom/Containerfile does not build on the stock image
+                prepull.cancel()
                 image_tag = ask_field(
                     number=n, icon="\U0001f433",
                     label=t("steps.configure.image_tag_label"),
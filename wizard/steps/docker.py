@@ -1,15 +1,26 @@
 """Step 4: Start Docker Compose containers."""
 
 import json
+import queue
+import shlex
 import sys
+import threading
 import time
 
-from ..theme import console
-from ..ui import step_header, step, ok, fail, info, animated_wait
+from rich.table import Table
+from rich import box
+
+from .. import journal, prepull
+from ..theme import console, ACCENT, OK, WARN, ERR, MUTED
+from ..ui import step_header, step, ok, fail, info
 from ..i18n import t
 from .configure import Config
+from .env_file import _build_env_content
 from . import TOTAL_STEPS
 
+# pip's cache inside the backend container, kept in the pip_cache volume
+PIP_CACHE_DIR = "/home/frappe/.cache/pip"
+
 
 def build_compose_cmd(cfg: Config) -> str:
     """Build the docker compose command with correct override files."""
@@ -36,6 +47,9 @@ def build_compose_cmd(cfg: Config) -> str:
     if cfg.enable_autoheal:
         files.append("compose.autoheal.yaml")
 
+    files.append("compose.wheels.yaml")
+    files.append("compose.healthcheck.yaml")
+
     cmd = "docker compose " + " ".join(f"-f {f}" for f in files)
     if cfg.deploy_mode == "remote":
         cmd = f"cd ~/frappe_docker && {cmd}"
@@ -57,18 +71,7 @@ def _write_portainer_overlay(executor, cfg):
 volumes:
   portainer_data:
 '''
-    if cfg.deploy_mode == "remote":
-        import tempfile, os
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            tmp = f.name
-        try:
-            executor.upload(tmp, "~/frappe_docker/compose.portainer.yaml")
-        finally:
-            os.unlink(tmp)
-    else:
-        with open("compose.portainer.yaml", "w") as f:
-            f.write(content)
+    _write_overlay(executor, cfg, "compose.portainer.yaml", content)
 
 
 def _write_autoheal_overlay(executor, cfg):
@@ -83,81 +86,405 @@ def _write_autoheal_overlay(executor, cfg):
     volumes:
       - /var/run/docker.sock:/var/run/docker.sock
 '''
+    _write_overlay(executor, cfg, "compose.autoheal.yaml", content)
+
+
+def _write_wheels_overlay(executor, cfg):
+    """Write compose.wheels.yaml: a persistent pip cache for the backend.
+
+    Wheels built while installing apps survive ``compose down`` and are
+    reused by later installs instead of being rebuilt.
+    """
+    content = f'''services:
+  backend:
+    environment:
+      PIP_CACHE_DIR: {PIP_CACHE_DIR}
+    volumes:
+      - pip_cache:{PIP_CACHE_DIR}
+
+volumes:
+  pip_cache:
+'''
+    _write_overlay(executor, cfg, "compose.wheels.yaml", content)
+
+
+def _tcp_check(host: str, port: int) -> str:
+    """Healthcheck test that passes once *host*:*port* accepts connections."""
+    return f'["CMD", "bash", "-c", "exec 3<>/dev/tcp/{host}/{port}"]'
+
+
+def _write_healthcheck_overlay(executor, cfg):
+    """Write compose.healthcheck.yaml: a healthcheck for every service.
+
+    frappe_docker defines few healthchecks, so a container counts as up as
+    soon as its process starts.  These make ``Health`` turn ``healthy``
+    only once the service can do its job: gunicorn, nginx and socket.io
+    listen, the databases answer, and the workers can reach their queue.
+    """
+    if cfg.db_type == "postgres":
+        db_test = '["CMD", "pg_isready", "-U", "postgres"]'
+    else:
+        db_test = '["CMD", "mariadb-admin", "ping", "-h", "localhost"]'
+    checks = {
+        "backend": _tcp_check("127.0.0.1", 8000),
+        "frontend": _tcp_check("127.0.0.1", 8080),
+        "websocket": _tcp_check("127.0.0.1", 9000),
+        "queue-short": _tcp_check("redis-queue", 6379),
+        "queue-long": _tcp_check("redis-queue", 6379),
+        "db": db_test,
+        "redis-cache": '["CMD", "redis-cli", "ping"]',
+        "redis-queue": '["CMD", "redis-cli", "ping"]',
+    }
+    content = "services:\n" + "".join(
+        f'''  {service}:
+    healthcheck:
+      test: {test}
+      interval: 5s
+      timeout: 5s
+      retries: 12
+      start_period: 10s
+'''
+        for service, test in checks.items()
+    )
+    _write_overlay(executor, cfg, "compose.healthcheck.yaml", content)
+
+
+def _write_overlay(executor, cfg, name: str, content: str):
+    """Write a compose overlay file into the frappe_docker directory."""
     if cfg.deploy_mode == "remote":
         import tempfile, os
         with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
             f.write(content)
             tmp = f.name
         try:
-            executor.upload(tmp, "~/frappe_docker/compose.autoheal.yaml")
+            executor.upload(tmp, f"~/frappe_docker/{name}")
         finally:
             os.unlink(tmp)
     else:
-        with open("compose.autoheal.yaml", "w") as f:
+        with open(name, "w") as f:
             f.write(content)
 
 
-def _wait_for_healthy(executor, compose_cmd: str, timeout: int = 120) -> bool:
-    """Poll container health until all services are running or timeout."""
-    step(t("steps.docker.health_checking"))
-    start = time.time()
-    while time.time() - start < timeout:
-        result = executor.run(f"{compose_cmd} ps --format json", capture=True)
-        if isinstance(result, tuple):
-            code, stdout, _ = result
-        else:
-            break  # fallback
-        if code == 0 and stdout.strip():
-            lines = stdout.strip().split("\n")
-            all_up = True
-            for line in lines:
+def _services_running(executor, compose_cmd: str) -> bool:
+    """True if the backend and db services are running."""
+    code, stdout, _ = executor.run(
+        f"{compose_cmd} ps --status running --services", capture=True,
+    )
+    return code == 0 and {"backend", "db"} <= set(stdout.split())
+
+
+# Container events that can change whether a service is ready
+_WAKE_EVENTS = ("start", "die", "health_status")
+
+
+def _compose_project(executor, compose_cmd: str) -> str:
+    """The stack's compose project name, or "" if it cannot be read."""
+    code, stdout, _ = executor.run(f"{compose_cmd} config", capture=True)
+    if code == 0:
+        for line in stdout.splitlines():
+            if line.startswith("name:"):
+                return line.split(":", 1)[1].strip().strip("'\"")
+    return ""
+
+
+def _follow_events(executor, compose_cmd: str, timeout: int):
+    """Stream the stack's container events from the Docker host for *timeout* seconds.
+
+    Only start, die and health_status events of this compose project are
+    followed: healthcheck and ``compose exec`` runs raise exec events all
+    the time, and other projects are none of our business.
+
+    Returns (queue, close): the queue receives every event (a dict) as it
+    happens, then None once the feed ends — at the deadline, after
+    ``close()``, or right away if the host cannot stream events.
+    ``close()`` stops ``docker events`` at once.
+    """
+    filters = "--filter type=container " + " ".join(
+        f"--filter event={event}" for event in _WAKE_EVENTS)
+    project = _compose_project(executor, compose_cmd)
+    if project:
+        filters += " --filter " + shlex.quote(f"label={_PROJECT_LABEL}={project}")
+    # docker events also exits by itself at --until, so the feed never
+    # outlives the wait even if close() cannot reach it
+    cmd = (f"exec docker events {filters} --format '{{{{json .}}}}' "
+           f"--until $(( $(date +%s) + {int(timeout)} ))")
+    events: queue.Queue = queue.Queue()
+    closed = threading.Event()
+    streams = []
+
+    def read():
+        with executor.stream(cmd, tail=20) as out:
+            streams.append(out)
+            # close() may have run before the stream existed; leaving the
+            # block then stops it
+            if closed.is_set():
+                return
+            for line in out:
                 try:
-                    svc = json.loads(line)
-                    state = svc.get("State", "")
-                    if state != "running":
-                        all_up = False
-                        break
-                except (json.JSONDecodeError, KeyError):
-                    all_up = False
-                    break
-            if all_up and len(lines) > 0:
-                ok(t("steps.docker.all_healthy"))
+                    events.put(json.loads(line))
+                except ValueError:
+                    continue
+        events.put(None)
+
+    def close():
+        closed.set()
+        for out in streams:
+            out.abort()
+
+    threading.Thread(target=read, daemon=True).start()
+    return events, close
+
+
+def _next_events(events: queue.Queue, timeout: float) -> bool:
+    """Wait up to *timeout* for events, then take all queued ones at once.
+
+    A burst of events thus costs one re-check.  Returns False once the
+    feed has ended.
+    """
+    try:
+        event = events.get(timeout=timeout)
+        while event is not None:
+            event = events.get_nowait()
+        return False
+    except queue.Empty:
+        return True
+
+
+def _wait_for(executor, compose_cmd: str, ready, timeout: int,
+              recheck: float | None = None) -> bool:
+    """Wait until ``ready()`` is true, re-checking on the stack's container events.
+
+    A container that starts or turns healthy is noticed the moment Docker
+    reports it.  With *recheck*, ``ready()`` also runs after that many
+    seconds without events (for conditions no event announces).  If the
+    event feed is unavailable, ``ready()`` is polled every 5 seconds.  The
+    event feed is stopped as soon as the wait ends.
+    """
+    deadline = time.time() + timeout
+    events, close = _follow_events(executor, compose_cmd, timeout)
+    try:
+        if ready():
+            return True
+        feed = True
+        while time.time() < deadline:
+            remaining = max(deadline - time.time(), 0)
+            if feed:
+                feed = _next_events(events, min(recheck or remaining, remaining))
+            else:
+                time.sleep(min(recheck or 5, remaining))
+            if ready():
                 return True
-        time.sleep(5)
-    fail(t("steps.docker.health_timeout"))
+        return False
+    finally:
+        close()
+
+
+def _pending_services(executor, compose_cmd: str) -> list[str] | None:
+    """Services that are not ready yet, as "name (state)"; None if unknown.
+
+    A service is ready when it runs and, if it has a healthcheck, reports
+    ``healthy``.
+    """
+    code, stdout, _ = executor.run(f"{compose_cmd} ps --format json", capture=True)
+    if code != 0 or not stdout.strip():
+        return None
+    pending = []
+    for line in stdout.strip().split("\n"):
+        try:
+            svc = json.loads(line)
+            state, health = svc.get("State", ""), svc.get("Health", "")
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        if state != "running":
+            pending.append(f"{svc.get('Service', '?')} ({state})")
+        elif health not in ("", "healthy"):
+            pending.append(f"{svc.get('Service', '?')} ({health})")
+    return pending
+
+
+def _wait_for_healthy(executor, compose_cmd: str, timeout: int = 180) -> bool:
+    """Wait until all services are running and healthy, driven by Docker events.
+
+    Names the services still starting whenever that list changes after the
+    first seconds, and those that never became healthy on timeout.
+    """
+    step(t("steps.docker.health_checking"))
+    start = time.time()
+    pending: list[str] | None = None
+
+    def ready() -> bool:
+        nonlocal pending
+        now_pending = _pending_services(executor, compose_cmd)
+        if now_pending and now_pending != pending and time.time() - start > 10:
+            info(t("steps.docker.health_waiting_on", services=", ".join(now_pending)))
+        pending = now_pending
+        return pending == []
+
+    if _wait_for(executor, compose_cmd, ready, timeout):
+        ok(t("steps.docker.all_healthy", seconds=f"{time.time() - start:.0f}"))
+        return True
+    fail(t("steps.docker.health_timeout", services=", ".join(pending or ["?"])))
     return False
 
 
+# Seconds between database probes when no container event arrives
+_DB_RECHECK = 5
+
+
 def _wait_for_db(executor, compose_cmd: str, cfg, timeout: int = 60) -> bool:
-    """Poll until the database service accepts connections."""
+    """Wait until the database service accepts connections."""
     step(t("steps.docker.waiting_db_ready"))
     if cfg.db_type == "postgres":
         probe = f"{compose_cmd} exec -T db pg_isready -U postgres"
     else:
         probe = f"{compose_cmd} exec -T db mariadb-admin ping -h localhost"
 
-    start = time.time()
-    while time.time() - start < timeout:
-        code = executor.run(probe)
-        if code == 0:
-            ok(t("steps.docker.db_ready"))
-            return True
-        time.sleep(3)
+    # A server accepting connections raises no event of its own; the db
+    # container turning healthy does, and the recheck is only a safety net
+    if _wait_for(executor, compose_cmd, lambda: executor.run(probe, capture=True)[0] == 0,
+                 timeout, recheck=_DB_RECHECK):
+        ok(t("steps.docker.db_ready"))
+        return True
     fail(t("steps.docker.db_timeout"))
     return False
 
 
-def run_docker(cfg: Config, executor):
-    """Bring up Docker Compose stack."""
+_HASH_LABEL = "com.docker.compose.config-hash"
+_SERVICE_LABEL = "com.docker.compose.service"
+_PROJECT_LABEL = "com.docker.compose.project"
+
+# Plan actions, in display order
+_ACTIONS = ("create", "recreate", "start", "remove", "unchanged")
+
+
+def _needs_start(status: str, exit_code: str, restart: str) -> bool:
+    """True for a container that should be running but is not.
+
+    Services that Docker keeps restarting are long-running; any other
+    container that exited cleanly was a one-shot job that has finished.
+    """
+    if status == "running":
+        return False
+    one_shot = restart not in ("always", "unless-stopped")
+    return not (one_shot and status == "exited" and exit_code == "0")
+
+
+def _compose_diff(executor, compose_cmd: str) -> dict[str, str] | None:
+    """Compare the rendered configuration with the containers that exist.
+
+    Compose labels every container with the hash of its service's config,
+    and ``config --hash`` renders the same hash for the target (overlays
+    and ``.env`` included).  Returns {service: action} with an action from
+    ``_ACTIONS``, or None if either side could not be read.  A one-shot
+    service such as ``configurator`` that exited with code 0 has done its
+    job and counts as unchanged.
+    """
+    plan = executor.plan()
+    plan.add(f"{compose_cmd} config --hash '*'")
+    plan.add(
+        f"ids=$({compose_cmd} ps -a -q) && {{ [ -z \"$ids\" ] || docker inspect --format "
+        f"'{{{{index .Config.Labels \"{_SERVICE_LABEL}\"}}}} "
+        f"{{{{index .Config.Labels \"{_HASH_LABEL}\"}}}} {{{{.State.Status}}}} "
+        f"{{{{.State.ExitCode}}}} {{{{or .HostConfig.RestartPolicy.Name \"no\"}}}}' $ids; }}"
+    )
+    results = plan.run()
+    if len(results) != len(plan) or not all(r.ok for r in results):
+        return None
+
+    target = {}
+    for line in results[0].output.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            target[parts[0]] = parts[1]
+    if not target:
+        return None
+    current = {}
+    for line in results[1].output.splitlines():
+        parts = line.split()
+        if len(parts) == 5:
+            current[parts[0]] = tuple(parts[1:])
+
+    diff = {}
+    for service, config_hash in target.items():
+        if service not in current:
+            diff[service] = "create"
+        elif current[service][0] != config_hash:
+            diff[service] = "recreate"
+        elif _needs_start(*current[service][1:]):
+            diff[service] = "start"
+        else:
+            diff[service] = "unchanged"
+    for service in current.keys() - target.keys():
+        diff[service] = "remove"
+    return diff
+
+
+def _print_plan(diff: dict[str, str]):
+    """Show what ``compose up`` would change, one row per service."""
+    styles = {"create": OK, "recreate": WARN, "start": ACCENT, "remove": ERR, "unchanged": MUTED}
+    table = Table(title=t("steps.docker.plan_title"), box=box.ROUNDED, border_style=ACCENT)
+    table.add_column(t("steps.docker.plan_service"), style="bold")
+    table.add_column(t("steps.docker.plan_action"))
+    for service, action in sorted(diff.items(), key=lambda item: (_ACTIONS.index(item[1]), item[0])):
+        table.add_row(service, f"[{styles[action]}]{t('steps.docker.plan_' + action)}[/]")
+    console.print()
+    console.print(table)
+
+
+def _reconcile(executor, compose_cmd: str, diff: dict[str, str]):
+    """Bring a running stack to the target config, touching only what changed."""
+    changed = [service for service, action in diff.items() if action != "unchanged"]
+    if not changed:
+        ok(t("steps.docker.stack_unchanged"))
+        return
+    step(t("steps.docker.reconciling", services=", ".join(sorted(changed))))
+    code = executor.run(f"{compose_cmd} up -d --remove-orphans")
+    if code != 0:
+        fail(t("steps.docker.start_failed"))
+        sys.exit(1)
+    ok(t("steps.docker.reconciled", count=len(changed)))
+
+
+def _wait_until_ready(executor, compose_cmd: str, cfg):
+    """Wait for healthy containers, then for the database."""
+    console.print()
+    _wait_for_healthy(executor, compose_cmd)
+
+    # Verify database is actually accepting connections
+    console.print()
+    _wait_for_db(executor, compose_cmd, cfg)
+
+
+def run_docker(cfg: Config, executor, plan_only: bool = False):
+    """Bring up Docker Compose stack.
+
+    A running stack is reconciled: only services whose configuration
+    changed are recreated.  With *plan_only*, print those changes and stop.
+    """
     step_header(4, TOTAL_STEPS, t("steps.docker.title"))
 
     # Build custom Docker image if requested
-    if cfg.build_image:
+    build_inputs = (
+        cfg.image_tag, cfg.erpnext_version, cfg.extra_apps,
+        [(app.repo_url, app.branch) for app in cfg.community_apps],
+        [(app["url"], app["branch"]) for app in cfg.custom_apps],
+    )
+    if plan_only:
+        pass  # the plan compares configuration; an image is not built for it
+    elif cfg.build_image and journal.completed(
+        "docker.build", build_inputs,
+        probe=lambda: executor.run(
+            f"docker image inspect {shlex.quote(cfg.image_tag)}", capture=True,
+        )[0] == 0,
+    ):
+        ok(t("steps.docker.build_resumed", tag=cfg.image_tag))
+    elif cfg.build_image:
         from ..commands.build import run_build_image
         cd_prefix = "cd ~/frappe_docker && " if cfg.deploy_mode == "remote" else ""
         console.print()
         if not run_build_image(cfg, executor, cd_prefix=cd_prefix):
             sys.exit(1)
+        journal.record("docker.build", build_inputs)
 
     # Write overlay files for optional services
     if cfg.enable_portainer:
@@ -166,32 +493,53 @@ def run_docker(cfg: Config, executor):
     if cfg.enable_autoheal:
         _write_autoheal_overlay(executor, cfg)
 
+    _write_wheels_overlay(executor, cfg)
+    _write_healthcheck_overlay(executor, cfg)
+
     compose_cmd = build_compose_cmd(cfg)
 
-    step(t("steps.docker.cleaning"))
-    code = executor.run(f"{compose_cmd} down")
-    if code != 0:
-        fail(t("steps.docker.down_failed"))
-        sys.exit(1)
-    ok(t("steps.docker.cleaned"))
+    # Resume: the stack from the previous run is up with the same config
+    docker_inputs = (compose_cmd, _build_env_content(cfg))
+    if journal.completed("docker", docker_inputs,
+                         probe=lambda: _services_running(executor, compose_cmd)):
+        ok(t("steps.docker.resumed"))
+        return
 
-    console.print()
-    step(t("steps.docker.starting"))
-    info(t("steps.docker.first_time_hint"))
-    code = executor.run(f"{compose_cmd} up -d")
-    if code != 0:
-        fail(t("steps.docker.start_failed"))
-        sys.exit(1)
-    ok(t("steps.docker.running"))
+    diff = _compose_diff(executor, compose_cmd)
+    if plan_only:
+        if diff is None:
+            fail(t("steps.docker.plan_unavailable"))
+        else:
+            _print_plan(diff)
+        return
 
-    console.print()
-    # Try health polling first, fall back to timed wait
-    if not _wait_for_healthy(executor, compose_cmd):
-        wait_time = 35 if cfg.deploy_mode == "remote" else 25
-        animated_wait(wait_time, t("steps.docker.waiting_db"))
+    if diff is not None and any(action != "create" for action in diff.values()):
+        # A stack exists: recreate only the services whose config changed
+        prepull.finish()
+        _reconcile(executor, compose_cmd, diff)
+    else:
+        step(t("steps.docker.cleaning"))
+        code = executor.run(f"{compose_cmd} down")
+        if code != 0:
+            fail(t("steps.docker.down_failed"))
+            sys.exit(1)
+        ok(t("steps.docker.cleaned"))
 
-    # Verify database is actually accepting connections
-    console.print()
-    if not _wait_for_db(executor, compose_cmd, cfg):
-        # Even if probe fails, give some extra time and proceed
-        animated_wait(15, t("steps.docker.waiting_db"))
+        console.print()
+        prepull.finish()
+        step(t("steps.docker.starting"))
+        info(t("steps.docker.first_time_hint"))
+        code = executor.run(f"{compose_cmd} up -d")
+        if code != 0:
+            fail(t("steps.docker.start_failed"))
+            sys.exit(1)
+        ok(t("steps.docker.running"))
+
+    # A fresh named volume is created root-owned; pip runs as frappe
+    executor.run(
+        f"{compose_cmd} exec -T -u root backend chown frappe:frappe {PIP_CACHE_DIR}",
+        capture=True,
+    )
+
+    _wait_until_ready(executor, compose_cmd, cfg)
+    journal.record("docker", docker_inputs)
@@ -5,20 +5,26 @@ import sys
 
 from ..ui import step_header, step, ok, fail, info
 from ..utils import check_tool, run
-from ..ssh import SSHExecutor
+from ..ssh import PlanResult
 from ..i18n import t
 from . import TOTAL_STEPS
 from .configure import Config
 
 
-def _check_remote_tool(executor: SSHExecutor, name: str, cmd: str) -> bool:
-    """Check a tool exists on the remote host."""
+_REMOTE_TOOLS = [
+    ("Docker", "docker --version"),
+    ("Docker Compose", "docker compose version"),
+    ("Git", "git --version"),
+]
+
+
+def _check_remote_tool(name: str, result: PlanResult | None) -> bool:
+    """Report whether a tool exists on the remote host from its plan result."""
     step(t("steps.prerequisites.checking_remote", name=name))
-    code, out, _ = executor.run(cmd, capture=True)
-    if code != 0:
+    if result is None or not result.ok:
         fail(t("steps.prerequisites.remote_not_found", name=name))
         return False
-    version = out.strip()
+    version = result.output.strip()
     ok(t("steps.prerequisites.remote_found", name=name, version=version))
     return True
 
@@ -44,19 +50,23 @@ def run_prerequisites(cfg: Config, executor):
         from ..theme import console
         console.print()
 
-        # Check remote tools
-        if not _check_remote_tool(executor, "Docker", "docker --version"):
-            sys.exit(1)
-        if not _check_remote_tool(executor, "Docker Compose", "docker compose version"):
-            sys.exit(1)
-        if not _check_remote_tool(executor, "Git", "git --version"):
-            sys.exit(1)
+        # Check remote tools and the frappe_docker folder in one round trip
+        plan = executor.plan()
+        for _, cmd in _REMOTE_TOOLS:
+            plan.add(cmd)
+        plan.add("test -f ~/frappe_docker/compose.yaml")
+        results = plan.run()
+        results += [None] * (len(plan) - len(results))
+
+        for (name, _), result in zip(_REMOTE_TOOLS, results):
+            if not _check_remote_tool(name, result):
+                sys.exit(1)
 
         # Clone frappe_docker on remote if needed
         console.print()
         step(t("steps.prerequisites.checking_remote_folder"))
-        code, _, _ = executor.run("test -f ~/frappe_docker/compose.yaml", capture=True)
-        if code != 0:
+        folder_result = results[-1]
+        if folder_result is None or not folder_result.ok:
             step(t("steps.prerequisites.cloning_repo_remote"))
             code = executor.run(
                 "git clone https://github.com/frappe/frappe_docker ~/frappe_docker"
@@ -1,9 +1,15 @@
 """Step 5: Create ERPNext site, configure hosts, show completion."""
 
+import asyncio
+import json
 import platform
+import posixpath
+import re
 import shlex
 import sys
+import threading
 import time
+from typing import NamedTuple
 
 from rich.align import Align
 from rich.panel import Panel
@@ -13,17 +19,20 @@ from rich.text import Text
 from rich.console import Group
 from rich import box
 
-from ..theme import console, ACCENT, OK, WARN, MUTED
-from ..ui import step_header, step, ok, fail, info
+from ..theme import console, ACCENT, OK, WARN, ERR, MUTED
+from ..ui import step_header, step, ok, fail, info, follow_stream, show_tail, task_progress
 from ..utils import version_branch
-from ..apps import OPTIONAL_APPS, detect_best_branch
+from ..apps import OPTIONAL_APPS, detect_best_branch, install_order, parse_required_apps
 from .configure import Config
 from ..i18n import t
 from . import TOTAL_STEPS
 from .docker import build_compose_cmd
+from ..session import BackendSession
+from .. import journal, snapshots, trace
+from ..ssh import create_executor
 
 
-def _create_site(cfg: Config, executor, compose_cmd: str):
+def _create_site(cfg: Config, backend):
     """Create the ERPNext site via bench, with automatic retry on failure."""
     from ..prompts import confirm_action
 
@@ -36,7 +45,7 @@ def _create_site(cfg: Config, executor, compose_cmd: str):
     retry_delay = 10
 
     new_site_cmd = (
-        f"{compose_cmd} exec -T backend bench new-site {shlex.quote(cfg.site_name)} "
+        f"bench new-site {shlex.quote(cfg.site_name)} "
         f"--install-app erpnext "
         f"--db-root-password {shlex.quote(cfg.db_password)} "
         f"--admin-password {shlex.quote(cfg.admin_password)}"
@@ -45,7 +54,7 @@ def _create_site(cfg: Config, executor, compose_cmd: str):
 
     # Automatic retries for transient DB connection errors
     for attempt in range(1, max_auto_retries + 1):
-        code = executor.run(new_site_cmd)
+        code = backend.run(new_site_cmd)
         if code == 0:
             break
         if attempt < max_auto_retries:
@@ -61,52 +70,527 @@ def _create_site(cfg: Config, executor, compose_cmd: str):
                 sys.exit(1)
             console.print()
             step(t("steps.site.creating", site_name=site_escaped))
-            code = executor.run(new_site_cmd)
+            code = backend.run(new_site_cmd)
             if code == 0:
                 break
 
     ok(t("steps.site.created"))
+    _enable_scheduler(cfg, backend)
 
+
+def _enable_scheduler(cfg: Config, backend):
     console.print()
     step(t("steps.site.enabling_scheduler"))
-    code = executor.run(f"{compose_cmd} exec -T backend bench --site {shlex.quote(cfg.site_name)} enable-scheduler")
+    code = backend.run(f"bench --site {shlex.quote(cfg.site_name)} enable-scheduler")
     if code != 0:
         fail(t("steps.site.scheduler_failed"))
     else:
         ok(t("steps.site.scheduler_enabled"))
 
 
-def _create_extra_site(extra: dict, cfg: Config, executor, compose_cmd: str):
-    """Create an additional site with the same apps."""
-    site_escaped = extra["name"].replace("[", "\\[")
-    step(t("steps.site.creating_extra_site", site_name=site_escaped))
+def _bundled_apps(cfg: Config, backend) -> list[str]:
+    """Selected apps, if every one is already fetched and registered.
+
+    This is the case with a custom image from ``build`` that bakes the apps
+    in.  Returns [] if any app still needs ``bench get-app``.
+    """
+    app_names = _selected_app_names(cfg)
+    if not app_names:
+        return []
+    plan = backend.plan()
+    plan.add("ls -1 apps")
+    plan.add("cat sites/apps.txt")
+    results = plan.run()
+    if not _plan_ok(results, len(plan)):
+        return []
+    present = set(results[0].output.split()) & set(results[1].output.split())
+    return app_names if set(app_names) <= present else []
+
+
+class _InstallTracker:
+    """Follow the ``Installing <app>...`` lines bench new-site prints.
+
+    An app has finished once the next one starts, or, for the last one,
+    once new-site reports the scheduler status after all installs.
+    Doubles as a progress source for follow_stream: *total* counts frappe
+    and erpnext plus the extra apps.
+    """
+
+    _PATTERN = re.compile(r"^Installing (\S+?)\.\.\.")
+    _DONE_PATTERN = re.compile(r"^\*\*\* Scheduler is \w+ \*\*\*")
+
+    def __init__(self, app_count: int):
+        self.started: list[str] = []
+        self.all_done = False
+        self.current = 0
+        self.total = app_count + 2
+
+    def __call__(self, line: str):
+        line = line.strip()
+        m = self._PATTERN.match(line)
+        if m and m.group(1) not in self.started:
+            self.started.append(m.group(1))
+            self.current = len(self.started)
+        elif self._DONE_PATTERN.match(line):
+            self.all_done = True
+
+    @property
+    def unfinished(self) -> str:
+        """The app whose install started but never finished, or ""."""
+        return self.started[-1] if self.started and not self.all_done else ""
+
+
+def _create_site_with_apps(cfg: Config, backend, app_names: list[str]) -> int | None:
+    """Create the site and install every already-fetched app in one new-site.
+
+    A single ``bench new-site --install-app ...`` boots Frappe once instead
+    of once per app.  Bench installs the apps in order, so if it fails the
+    last ``Installing`` line names the culprit; the apps after it are then
+    installed one by one.
+
+    Returns the number of apps installed, or None if the site itself could
+    not be created (the caller falls back to ``_create_site``).
+    """
+    site_escaped = cfg.site_name.replace("[", "\\[")
+    step(t("steps.site.creating_with_apps", site_name=site_escaped, count=len(app_names)))
+    info(t("steps.site.creating_hint"))
 
     db_type_flag = " --db-type postgres" if cfg.db_type == "postgres" else ""
-    site_q = shlex.quote(extra["name"])
+    install_flags = "".join(f" --install-app {shlex.quote(name)}"
+                            for name in ["erpnext", *app_names])
+    tracker = _InstallTracker(len(app_names))
+    with backend.stream(
+        f"bench new-site {shlex.quote(cfg.site_name)}{install_flags} "
+        f"--db-root-password {shlex.quote(cfg.db_password)} "
+        f"--admin-password {shlex.quote(cfg.admin_password)}"
+        f"{db_type_flag}",
+        parsers=[tracker],
+    ) as out:
+        code = follow_stream(out, t("steps.site.creating", site_name=site_escaped),
+                             progress=tracker)
 
-    code = executor.run(
-        f"{compose_cmd} exec -T backend bench new-site {site_q} "
-        f"--install-app erpnext "
+    if code == 0:
+        ok(t("steps.site.created_with_apps", count=len(app_names)))
+        _record_apps(cfg, app_names)
+        _enable_scheduler(cfg, backend)
+        return len(app_names)
+
+    culprit = tracker.unfinished
+    if culprit not in app_names:
+        # Failed in frappe/erpnext itself, or in new-site after the
+        # installs: start over the regular way
+        fail(t("steps.site.create_failed"))
+        show_tail(out)
+        info(t("steps.site.bundled_fallback"))
+        backend.run(
+            f"bench drop-site {shlex.quote(cfg.site_name)} --force --no-backup "
+            f"--db-root-password {shlex.quote(cfg.db_password)}",
+            capture=True,
+        )
+        return None
+
+    ok(t("steps.site.created"))
+    failed_at = app_names.index(culprit)
+    for name in app_names[:failed_at]:
+        ok(t("steps.site.app_installed", app=name))
+    fail(t("steps.site.app_failed", app=culprit))
+    show_tail(out, lines=5)
+    done = app_names[:failed_at]
+    for name in app_names[failed_at + 1:]:
+        code = backend.run(
+            f"bench --site {shlex.quote(cfg.site_name)} install-app {shlex.quote(name)}"
+        )
+        if code == 0:
+            done.append(name)
+            ok(t("steps.site.app_installed", app=name))
+        else:
+            fail(t("steps.site.app_failed", app=name))
+    _record_apps(cfg, done)
+    _enable_scheduler(cfg, backend)
+    return len(done)
+
+
+def _run_site_jobs(cfg: Config, compose_cmd: str, jobs: dict[str, list[tuple[str, str]]],
+                   stop_on_error: bool) -> dict[str, list[tuple[str, int, str]]]:
+    """Run each site's backend commands in order, several sites at once.
+
+    *jobs* maps a site name to its (label, command) steps.  At most
+    ``cfg.site_concurrency`` sites run concurrently, and a multi-task
+    progress display shows every site's current step.
+
+    Returns, per site, (label, exit code, output) for each step that ran.
+    """
+    with task_progress() as progress:
+        return _run_backend_jobs(cfg, compose_cmd, jobs, stop_on_error,
+                                 cfg.site_concurrency, progress)
+
+
+def _job_ok(ran: list[tuple[str, int, str]], steps: list) -> bool:
+    """True if every one of a job's *steps* ran and exited with 0."""
+    return len(ran) == len(steps) and all(code == 0 for _, code, _ in ran)
+
+
+def _run_backend_jobs(cfg: Config, compose_cmd: str, jobs: dict[str, list[tuple[str, str]]],
+                      stop_on_error: bool, limit: int,
+                      progress) -> dict[str, list[tuple[str, int, str]]]:
+    """Run each job's backend commands in order, up to *limit* jobs at once.
+
+    Every job runs through its own one-shot ``docker compose exec`` and
+    gets a row in *progress*, which the caller displays.
+    """
+    aexec = create_executor(cfg, asynchronous=True)
+    results: dict[str, list[tuple[str, int, str]]] = {name: [] for name in jobs}
+
+    async def _job(task, name: str, steps, semaphore):
+        async with semaphore:
+            progress.start_task(task)
+            for label, cmd in steps:
+                progress.update(task, status=label)
+                code, out, err = await aexec.run(
+                    f"{compose_cmd} exec -T backend {cmd}", capture=True,
+                )
+                results[name].append((label, code, out + err))
+                progress.advance(task)
+                if code != 0 and stop_on_error:
+                    break
+        if not _job_ok(results[name], steps):
+            progress.update(task, description=f"[{ERR}]{name}[/]",
+                            status=t("steps.site.site_job_failed"))
+            progress.stop_task(task)
+        else:
+            progress.update(task, status=t("steps.site.site_job_done"))
+
+    async def _all():
+        semaphore = asyncio.Semaphore(max(1, limit))
+        coros = []
+        for name, steps in jobs.items():
+            task = progress.add_task(name, total=len(steps), start=False,
+                                     status=t("steps.site.site_job_queued"))
+            coros.append(_job(task, name, steps, semaphore))
+        await asyncio.gather(*coros)
+
+    asyncio.run(_all())
+    return results
+
+
+# Scratch directory for the template site's dump.  It lives in the backend
+# container's own filesystem, not in the sites volume that the frontend
+# also mounts, since the dump holds the whole database.
+_TEMPLATE_DIR = "/tmp/wizard-template"
+_BACKUP_DB_RE = re.compile(r"^Database\s*:\s*(\S+)", re.MULTILINE)
+
+
+def _prepare_site_template(cfg: Config, backend) -> dict | None:
+    """Dump the fully installed primary site for cloning extra sites.
+
+    Returns {"sql": path, "encryption_key": key} or None if the dump failed.
+    The encryption key is carried over because encrypted fields in the
+    copied database can only be read with the key that wrote them.  The
+    caller removes ``_TEMPLATE_DIR`` when done.
+    """
+    console.print()
+    step(t("steps.site.preparing_template", site_name=cfg.site_name))
+    site_q = shlex.quote(cfg.site_name)
+    dir_q = shlex.quote(_TEMPLATE_DIR)
+    plan = backend.plan()
+    plan.add(f"rm -rf {dir_q} && mkdir -m 700 {dir_q}")
+    plan.add(f"bench --site {site_q} backup --backup-path {dir_q}")
+    results = plan.run(stop_on_error=True)
+    m = _BACKUP_DB_RE.search(results[-1].output) if _plan_ok(results, len(plan)) else None
+    if m is not None:
+        # bench prints paths relative to the sites directory
+        dump = posixpath.join("/home/frappe/frappe-bench/sites", m.group(1))
+        sql_q = shlex.quote(f"{_TEMPLATE_DIR}/template.sql")
+        plan = backend.plan()
+        plan.add(f"gunzip -c {shlex.quote(dump)} > {sql_q}")
+        plan.add(f"cat sites/{site_q}/site_config.json")
+        results = plan.run(stop_on_error=True)
+    if m is None or not _plan_ok(results, len(plan)):
+        fail(t("steps.site.template_failed"))
+        if results:
+            show_tail(results[-1].output)
+        return None
+
+    try:
+        encryption_key = json.loads(results[-1].output).get("encryption_key", "")
+    except ValueError:
+        encryption_key = ""
+    ok(t("steps.site.template_ready"))
+    return {"sql": f"{_TEMPLATE_DIR}/template.sql", "encryption_key": encryption_key}
+
+
+def _extra_site_steps(cfg: Config, extra: dict, template: dict | None) -> list[tuple[str, str]]:
+    """(label, command) steps that create one extra site.
+
+    Without a template the site gets a fresh ERPNext install; with one it is
+    restored from the primary site's dump, so no app needs installing.
+    """
+    site_q = shlex.quote(extra["name"])
+    db_type_flag = " --db-type postgres" if cfg.db_type == "postgres" else ""
+    new_site = (
+        f"bench new-site {site_q} "
         f"--db-root-password {shlex.quote(cfg.db_password)} "
         f"--admin-password {shlex.quote(extra['admin_password'])}"
         f"{db_type_flag}"
     )
-    if code == 0:
-        ok(t("steps.site.extra_site_created", site_name=extra["name"]))
-        # Enable scheduler
-        executor.run(f"{compose_cmd} exec -T backend bench --site {site_q} enable-scheduler")
-    else:
-        fail(t("steps.site.extra_site_failed", site_name=extra["name"]))
+    if template is None:
+        return [
+            (t("steps.site.site_job_new_site"), f"{new_site} --install-app erpnext"),
+            (t("steps.site.site_job_scheduler"), f"bench --site {site_q} enable-scheduler"),
+        ]
+
+    steps = [
+        (t("steps.site.site_job_restore"),
+         f"{new_site} --source_sql {shlex.quote(template['sql'])}"),
+        # The restored database carries the primary's Administrator password
+        (t("steps.site.site_job_admin_password"),
+         f"bench --site {site_q} set-admin-password {shlex.quote(extra['admin_password'])}"),
+    ]
+    if template["encryption_key"]:
+        steps.append((
+            t("steps.site.site_job_encryption_key"),
+            f"bench --site {site_q} set-config encryption_key "
+            f"{shlex.quote(template['encryption_key'])}",
+        ))
+    steps.append((t("steps.site.site_job_scheduler"),
+                  f"bench --site {site_q} enable-scheduler"))
+    return steps
+
+
+def _extra_site_done(cfg: Config, name: str, existing: set[str]) -> bool:
+    """True if a resumed run already created extra site *name*."""
+    return journal.completed(f"site.extra.{name}", (name, cfg.extra_sites_strategy),
+                             probe=lambda: name in existing)
+
+
+def _create_extra_sites(cfg: Config, compose_cmd: str, template: dict | None = None,
+                        existing: set[str] = frozenset()) -> list[str]:
+    """Create the additional sites concurrently, from *template* if given.
+
+    Sites a resumed run already created (and that are among *existing*)
+    are skipped.  Returns the names of the sites that now exist.
+    """
+    created, pending = [], []
+    for extra in cfg.extra_sites:
+        if _extra_site_done(cfg, extra["name"], existing):
+            created.append(extra["name"])
+            ok(t("steps.site.extra_site_resumed", site_name=extra["name"]))
+        else:
+            pending.append(extra)
+    if not pending:
+        return created
+
+    console.print()
+    key = "steps.site.cloning_extra_sites" if template else "steps.site.creating_extra_sites"
+    step(t(key, count=len(pending), limit=cfg.site_concurrency))
+
+    jobs = {extra["name"]: _extra_site_steps(cfg, extra, template)
+            for extra in pending}
+
+    results = _run_site_jobs(cfg, compose_cmd, jobs, stop_on_error=True)
+
+    dropped = []
+    for site, steps in results.items():
+        if _job_ok(steps, jobs[site]):
+            created.append(site)
+            journal.record(f"site.extra.{site}", (site, cfg.extra_sites_strategy))
+            ok(t("steps.site.extra_site_created", site_name=site))
+            continue
+        fail(t("steps.site.extra_site_failed", site_name=site))
+        show_tail(steps[-1][2] if steps else "")
+        if template is not None and steps and steps[0][1] == 0:
+            dropped.append(site)
+    # A restored copy that missed a later step still has the primary
+    # site's admin password and encryption key: it must not stay up
+    executor = create_executor(cfg) if dropped else None
+    for site in dropped:
+        executor.run(
+            f"{compose_cmd} exec -T backend bench drop-site {shlex.quote(site)} "
+            f"--force --no-backup --db-root-password {shlex.quote(cfg.db_password)}",
+            capture=True,
+        )
+        info(t("steps.site.extra_site_dropped", site_name=site))
+    return created
+
+
+def _install_apps_on_extra_sites(cfg: Config, compose_cmd: str, sites: list[str],
+                                 order: list[str] | None = None):
+    """Install the primary site's apps on every extra site, sites in parallel.
+
+    The apps are already fetched, so each site only needs install-app, in
+    dependency *order* (see ``_plan_install_order``) if given.
+    """
+    app_names = _selected_app_names(cfg) if order is None else order
+    sites = [site for site in sites
+             if not journal.completed(f"site.extra.{site}.apps", (site, app_names))]
+    if not app_names or not sites:
+        return
+
+    console.print()
+    step(t("steps.site.installing_apps_extra_sites", count=len(sites)))
+    jobs = {
+        site: [(app_name, f"bench --site {shlex.quote(site)} install-app {shlex.quote(app_name)}")
+               for app_name in app_names]
+        for site in sites
+    }
+
+    results = _run_site_jobs(cfg, compose_cmd, jobs, stop_on_error=False)
+
+    for site, steps in results.items():
+        failed = [(app_name, output) for app_name, code, output in steps if code != 0]
+        for app_name, output in failed:
+            fail(t("steps.site.extra_site_app_failed", app=app_name, site_name=site))
+            show_tail(output, lines=5)
+        if not failed:
+            journal.record(f"site.extra.{site}.apps", (site, app_names))
+            ok(t("steps.site.extra_site_apps_done", count=len(app_names), site_name=site))
+
+
+class _AppPrefetch:
+    """Clone every selected app into ``apps/`` in the background.
+
+    Used as a context manager around primary site creation: the clones are
+    pure network I/O, so they run concurrently (``cfg.fetch_concurrency`` at
+    a time) while ``bench new-site`` works.  On exit the per-app progress
+    rows are shown until every clone has finished.  The clone is only the
+    first part of ``bench get-app``; ``_install_app`` runs the rest (see
+    ``_complete_prefetched_app``).  Apps that fail to clone are left to the
+    regular ``bench get-app``.
+    """
+
+    def __init__(self, cfg: Config, compose_cmd: str, apps: list[tuple[str, str, str]]):
+        self.cfg = cfg
+        self.compose_cmd = compose_cmd
+        self.apps = apps
+        self.progress = task_progress()
+        self.results: dict[str, list[tuple[str, int, str]]] = {}
+        self._thread = threading.Thread(target=self._fetch, daemon=True)
+
+    def _fetch(self):
+        jobs = {}
+        for name, source, branch in self.apps:
+            url = source if "/" in source or ":" in source else f"https://github.com/frappe/{source}.git"
+            target = shlex.quote(f"apps/{name}")
+            # The clone bench get-app makes; a failed clone leaves nothing behind
+            script = (
+                f"test -d {target} || GIT_TERMINAL_PROMPT=0 git clone --depth 1 "
+                f"--origin upstream --branch {shlex.quote(branch)} {shlex.quote(url)} {target} "
+                f"|| {{ rm -rf {target}; exit 1; }}"
+            )
+            jobs[name] = [(t("steps.site.app_job_clone", branch=branch),
+                           f"bash -c {shlex.quote(script)}")]
+        self.results = _run_backend_jobs(self.cfg, self.compose_cmd, jobs,
+                                         stop_on_error=True,
+                                         limit=self.cfg.fetch_concurrency,
+                                         progress=self.progress)
+
+    def __enter__(self) -> "_AppPrefetch":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return
+        console.print()
+        step(t("steps.site.prefetching_apps", limit=self.cfg.fetch_concurrency))
+        with self.progress:
+            self._thread.join()
+        failed = [name for name, steps in self.results.items()
+                  if any(code != 0 for _, code, _ in steps)]
+        if failed:
+            info(t("steps.site.prefetch_failed", apps=", ".join(failed)))
+        else:
+            ok(t("steps.site.prefetch_done", count=len(self.results)))
+
+
+def _restore_snapshot(cfg: Config, executor, backend, compose_cmd: str, key: str) -> bool:
+    """Create the primary site from the cached snapshot *key*, if there is one.
+
+    Returns True if the site was restored with all its apps.
+    """
+    snap = snapshots.find(executor, key)
+    if snap is None:
+        return False
+
+    console.print()
+    step(t("steps.site.restoring_snapshot", key=key))
+    template = snapshots.unpack(executor, backend, compose_cmd, snap)
+    if template is not None:
+        site = {"name": cfg.site_name, "admin_password": cfg.admin_password}
+        for label, cmd in _extra_site_steps(cfg, site, template):
+            code, output, _ = backend.run(cmd, capture=True)
+            if code != 0:
+                fail(t("steps.site.snapshot_step_failed", step=label))
+                show_tail(output)
+                template = None
+                break
+    snapshots.cleanup(backend)
+
+    if template is None:
+        info(t("steps.site.snapshot_fallback"))
+        # Drop the partly restored site so the regular install can start over
+        backend.run(
+            f"bench drop-site {shlex.quote(cfg.site_name)} --force --no-backup "
+            f"--db-root-password {shlex.quote(cfg.db_password)}",
+            capture=True,
+        )
+        return False
+    ok(t("steps.site.snapshot_restored", site_name=cfg.site_name))
+    return True
+
+
+def _save_snapshot(cfg: Config, executor, backend, compose_cmd: str,
+                   key: str, meta: dict):
+    """Store the freshly installed primary site as snapshot *key*."""
+    console.print()
+    step(t("steps.site.saving_snapshot", key=key))
+    app_names = [app["name"] for app in meta["apps"]]
+    if not snapshots.save(executor, backend, compose_cmd, cfg.site_name,
+                          key, meta, app_names):
+        info(t("steps.site.snapshot_save_failed"))
+        return
+    ok(t("steps.site.snapshot_saved"))
+    for snap in snapshots.prune(executor, cfg.snapshot_cache_max_mb):
+        info(t("steps.site.snapshot_evicted", key=snap.key))
+
+
+def _pip_install_apps(cfg: Config, backend) -> set[str]:
+    """pip-install every selected app already in ``apps/`` in one go.
+
+    One resolver run for all apps instead of one per app; the wheels land
+    in the pip_cache volume (compose.wheels.yaml).  Returns the apps that
+    are now installed, or an empty set to leave pip to ``_install_app``.
+    """
+    app_names = _selected_app_names(cfg)
+    code, output, _ = backend.run("ls -1 apps", capture=True)
+    fetched = [name for name in app_names if name in output.split()] if code == 0 else []
+    if not fetched:
+        return set()
+
+    console.print()
+    step(t("steps.site.pip_installing", count=len(fetched)))
+    editables = " ".join(f"-e {shlex.quote('apps/' + name)}" for name in fetched)
+    with backend.stream(f"pip install {editables}") as out:
+        code = follow_stream(out, t("steps.site.pip_installing", count=len(fetched)))
+    if code != 0:
+        info(t("steps.site.pip_batch_failed"))
+        show_tail(out, lines=5)
+        return set()
+    ok(t("steps.site.pip_installed", count=len(fetched)))
+    return set(fetched)
 
 
 def _install_app(repo_name: str, display_name: str, source: str,
                   branch: str, site_name: str, fail_key: str,
-                  executor=None, compose_cmd: str = "") -> bool:
-    """Run the 6-step install pipeline for a single Frappe app.
+                  backend=None, pip_installed: bool = False,
+                  assets: "_AssetBuild | None" = None) -> bool:
+    """Run the 4-step install pipeline for a single Frappe app.
 
     Docker production containers need explicit steps because
     ``bench get-app`` only clones the repo without pip-installing or
-    registering the app in ``sites/apps.txt``.
+    registering the app in ``sites/apps.txt``.  Step 2 is skipped when
+    *pip_installed* (see ``_pip_install_apps``); the asset build that used
+    to follow is left to *assets*.
 
     Returns True on success, False on failure.
     """
@@ -115,218 +599,362 @@ def _install_app(repo_name: str, display_name: str, source: str,
     branch_q = shlex.quote(branch)
     source_q = shlex.quote(source)
 
-    # Step 1: Clone app repo
-    code = executor.run(
-        f"{compose_cmd} exec -T backend bench get-app "
-        f"--branch {branch_q} {source_q}"
-    )
+    if journal.completed(f"site.app.{repo_name}", (site_name, source),
+                         probe=lambda: _in_apps_txt(backend, repo_name)):
+        ok(t("steps.site.app_resumed", app=display_name))
+        if assets is not None:
+            assets.add(repo_name)
+        return True
+
+    # Step 1: Fetch the app, or finish the clone _AppPrefetch left in apps/
+    if backend.run(f"test -d apps/{app_q}", capture=True)[0] == 0:
+        code = _complete_prefetched_app(backend, repo_name, branch)
+    else:
+        code = backend.run(f"bench get-app --skip-assets --branch {branch_q} {source_q}")
     if code != 0:
         fail(t(fail_key, app=display_name))
         return False
 
     # Step 2: pip install (bench get-app skips this in production containers)
-    code = executor.run(f"{compose_cmd} exec -T backend pip install -e apps/{app_q}")
-    if code != 0:
-        fail(t(fail_key, app=display_name))
-        return False
+    if not pip_installed:
+        code = backend.run(f"pip install -e apps/{app_q}")
+        if code != 0:
+            fail(t(fail_key, app=display_name))
+            return False
 
     # Step 3: Register in apps.txt if missing
-    executor.run(
-        f"{compose_cmd} exec -T backend bash -c "
+    backend.run(
+        f"bash -c "
         f"'grep -qxF \"$1\" sites/apps.txt || echo \"$1\" >> sites/apps.txt' _ {app_q}"
     )
 
     # Step 4: Install on site
-    code = executor.run(
-        f"{compose_cmd} exec -T backend bench --site {site_q} "
-        f"install-app {app_q}"
-    )
+    code = backend.run(f"bench --site {site_q} install-app {app_q}")
     if code != 0:
         fail(t(fail_key, app=display_name))
         return False
 
-    # Step 5: Build assets (CSS, JS, images)
-    build_code = executor.run(f"{compose_cmd} exec -T backend bench build --app {app_q}")
-    if build_code != 0:
-        fail(t("steps.site.app_build_failed", app=display_name))
-        return False
-
-    # Step 6: Copy assets to frontend container.
-    # bench build creates a symlink sites/assets/{app} -> apps/{app}/.../public
-    # but the frontend container doesn't have the apps/ volume, so the
-    # symlink is dangling.  Replace it with the actual files.
-    executor.run(
-        f"{compose_cmd} exec -T backend bash -c "
-        f"'if [ -L \"sites/assets/$1\" ]; then "
-        f"target=$(readlink -f \"sites/assets/$1\") && "
-        f"rm \"sites/assets/$1\" && "
-        f"cp -r \"$target\" \"sites/assets/$1\"; fi' _ {app_q}"
-    )
+    # Build assets and copy them for the frontend, once for all apps
+    if assets is not None:
+        assets.add(repo_name)
 
+    journal.record(f"site.app.{repo_name}", (site_name, source))
     return True
 
 
-def _install_extra_apps(cfg: Config, executor, compose_cmd: str) -> int:
-    """Download and install selected extra apps. Fail-soft per app.
+# bench's record of how each app was fetched (bench.apps.sync)
+_SYNC_APPS_JSON = (
+    "import json, os, subprocess, sys\n"
+    "app, branch = sys.argv[1:]\n"
+    "path = 'sites/apps.json'\n"
+    "states = json.load(open(path)) if os.path.exists(path) else {}\n"
+    "head = subprocess.run(['git', '-C', 'apps/' + app, 'rev-parse', 'HEAD'],\n"
+    "                      capture_output=True, text=True).stdout.strip()\n"
+    "states[app] = {'is_repo': True, 'required': [],\n"
+    "               'resolution': {'commit_hash': head, 'branch': branch}}\n"
+    "json.dump(states, open(path, 'w'), indent=4)\n"
+)
 
-    Returns the number of successfully installed apps.
+
+def _complete_prefetched_app(backend, repo_name: str, branch: str) -> int:
+    """Do what ``bench get-app`` does after its clone, for a prefetched app.
+
+    That is the app's node dependencies and its ``sites/apps.json`` entry;
+    the pip install, apps.txt entry and asset build follow in
+    ``_install_app`` as for any app.
     """
-    if not cfg.extra_apps:
+    app_q = shlex.quote(repo_name)
+    plan = backend.plan()
+    plan.add(f"[ ! -f apps/{app_q}/package.json ] || (cd apps/{app_q} && yarn install)")
+    plan.add(f"env/bin/python -c {shlex.quote(_SYNC_APPS_JSON)} {app_q} {shlex.quote(branch)}")
+    results = plan.run(stop_on_error=True)
+    if _plan_ok(results, len(plan)):
         return 0
+    if results:
+        show_tail(results[-1].output, lines=5)
+    return results[-1].code if results else 1
 
-    default_branch = version_branch(cfg.erpnext_version)
-    app_branch_map = {app.repo_name: app.branch for app in OPTIONAL_APPS}
-    console.print()
-    failed = []
-
-    for i, app_name in enumerate(cfg.extra_apps, 1):
-        step(t("steps.site.installing_apps", current=i, total=len(cfg.extra_apps)))
-        info(t("steps.site.installing_app", app=app_name))
-
-        # Smart branch: explicit override > detected > default
-        branch = app_branch_map.get(app_name)
-        if not branch:
-            detected = detect_best_branch(
-                f"https://github.com/frappe/{app_name}.git",
-                cfg.erpnext_version,
-            )
-            branch = detected or default_branch
 
-        # source=app_name: bench get-app resolves to github.com/frappe/{name}
-        if _install_app(app_name, app_name, app_name, branch,
-                        cfg.site_name, "steps.site.app_failed",
-                        executor=executor, compose_cmd=compose_cmd):
-            ok(t("steps.site.app_installed", app=app_name))
-        else:
-            failed.append(app_name)
+def _in_apps_txt(backend, app: str) -> bool:
+    return backend.run(f"grep -qxF {shlex.quote(app)} sites/apps.txt", capture=True)[0] == 0
 
-    console.print()
-    if failed:
-        fail(t("steps.site.apps_some_failed", failed=len(failed), total=len(cfg.extra_apps)))
-    else:
-        ok(t("steps.site.apps_done", count=len(cfg.extra_apps)))
 
-    return len(cfg.extra_apps) - len(failed)
+def _existing_sites(backend) -> set[str]:
+    """Names of the sites that have a site_config.json."""
+    code, out, _ = backend.run("ls -1 sites/*/site_config.json", capture=True)
+    if code != 0:
+        return set()
+    return {line.split("/")[1] for line in out.split() if line.count("/") == 2}
 
 
-def _install_community_apps(cfg: Config, executor, compose_cmd: str) -> int:
-    """Install selected community apps. Fail-soft per app.
+def _record_apps(cfg: Config, app_names: list[str]):
+    """Journal apps installed other than through _install_app."""
+    sources = {app.repo_name: app.repo_url for app in cfg.community_apps}
+    sources.update((app["name"], app["url"]) for app in cfg.custom_apps)
+    for name in app_names:
+        journal.record(f"site.app.{name}", (cfg.site_name, sources.get(name, name)))
 
-    Returns the number of successfully installed apps.
+
+class _AssetBuild:
+    """Defer asset builds to a single ``bench build`` after all app installs.
+
+    Building per app and then once more for everything compiles the same
+    assets twice and starts the node toolchain N+1 times.  Apps register
+    here while installing; ``run()`` builds once and fixes up their asset
+    symlinks in one pass.
     """
-    if not cfg.community_apps:
-        return 0
 
-    console.print()
-    failed = []
+    def __init__(self):
+        self.apps: list[str] = []
+
+    def add(self, app: str):
+        if app not in self.apps:
+            self.apps.append(app)
+
+    def run(self, backend) -> int:
+        """Build all assets, then copy the new apps' assets in place."""
+        console.print()
+        step(t("steps.site.building_assets"))
+        started = time.monotonic()
+        with backend.stream("bench build") as out:
+            code = follow_stream(out, t("steps.site.building_assets"))
+        elapsed = time.monotonic() - started
+        if code != 0:
+            info(t("steps.site.assets_warning"))
+            show_tail(out)
+            return code
+
+        # bench build creates a symlink sites/assets/{app} -> apps/{app}/.../public
+        # but the frontend container doesn't have the apps/ volume, so the
+        # symlink is dangling.  Replace it with the actual files.
+        if self.apps:
+            backend.run(
+                "bash -c "
+                "'for app in \"$@\"; do "
+                "if [ -L \"sites/assets/$app\" ]; then "
+                "target=$(readlink -f \"sites/assets/$app\") && "
+                "rm \"sites/assets/$app\" && "
+                "cp -r \"$target\" \"sites/assets/$app\"; fi; done' _ "
+                + " ".join(shlex.quote(app) for app in self.apps)
+            )
 
-    for i, app in enumerate(cfg.community_apps, 1):
-        step(t("steps.site.installing_community_apps", current=i, total=len(cfg.community_apps)))
-        info(t("steps.site.installing_community_app", app=app.display_name, url=app.repo_url))
+        ok(t("steps.site.assets_built"))
+        if self.apps:
+            info(t("steps.site.asset_builds_saved", skipped=len(self.apps),
+                   seconds=f"{elapsed:.0f}"))
+        trace.event("asset-build", apps=self.apps, skipped_builds=len(self.apps),
+                    duration=round(elapsed, 3))
+        return code
+
+
+def _extra_app_branch(cfg: Config, app_name: str) -> str:
+    """Branch of a frappe/ extra app: explicit override > detected > default."""
+    branch = {app.repo_name: app.branch for app in OPTIONAL_APPS}.get(app_name)
+    if branch:
+        return branch
+    detected = detect_best_branch(
+        f"https://github.com/frappe/{app_name}.git",
+        cfg.erpnext_version,
+    )
+    return detected or version_branch(cfg.erpnext_version)
 
-        if _install_app(app.repo_name, app.display_name, app.repo_url,
-                        app.branch, cfg.site_name, "steps.site.community_app_failed",
-                        executor=executor, compose_cmd=compose_cmd):
-            ok(t("steps.site.community_app_installed", app=app.display_name))
-        else:
-            failed.append(app.display_name)
 
-    console.print()
-    if failed:
-        fail(t("steps.site.community_apps_some_failed", failed=len(failed), total=len(cfg.community_apps)))
-    else:
-        ok(t("steps.site.community_apps_done", count=len(cfg.community_apps)))
+def _selected_app_names(cfg: Config) -> list[str]:
+    """Repo names of every selected app, in install order."""
+    return (
+        list(cfg.extra_apps)
+        + [app.repo_name for app in cfg.community_apps]
+        + [app["name"] for app in cfg.custom_apps]
+    )
 
-    return len(cfg.community_apps) - len(failed)
 
+def _selected_apps(cfg: Config) -> list[tuple[str, str, str]]:
+    """(repo_name, source, branch) of every selected app, in install order."""
+    return (
+        [(name, name, _extra_app_branch(cfg, name)) for name in cfg.extra_apps]
+        + [(app.repo_name, app.repo_url, app.branch) for app in cfg.community_apps]
+        + [(app["name"], app["url"], app["branch"]) for app in cfg.custom_apps]
+    )
 
-def _install_custom_apps(cfg: Config, executor, compose_cmd: str) -> int:
-    """Install custom private apps from Git URLs.
 
-    Returns the number of successfully installed apps.
+def _plan_install_order(cfg: Config, backend,
+                        app_names: list[str]) -> tuple[list[str], dict[str, list[str]]]:
+    """Order *app_names* by the ``required_apps`` in their hooks.py.
+
+    Needs the apps fetched.  Missing requirements and dependency cycles are
+    reported here, before any install starts; apps whose requirements can
+    never be met (directly or through another app) are left out.  Returns
+    (order, requires), requires mapping each app to its required apps.
+    """
+    plan = backend.plan()
+    plan.add("ls -1 apps")
+    for name in app_names:
+        app_dir = shlex.quote(f"apps/{name}")
+        plan.add(f'hooks=$(find {app_dir} -mindepth 2 -maxdepth 2 -name hooks.py | head -n 1) '
+                 f'&& cat "$hooks"')
+    results = plan.run()
+    results += [None] * (len(plan) - len(results))
+
+    fetched = set(results[0].output.split()) if results[0] and results[0].ok else set()
+    requires = {
+        name: parse_required_apps(result.output) if result and result.ok else []
+        for name, result in zip(app_names, results[1:])
+    }
+    order, missing, cycle = install_order(requires, fetched | {"frappe", "erpnext"})
+
+    if cycle:
+        fail(t("steps.site.app_dependency_cycle", apps=" → ".join(cycle + cycle[:1])))
+    blocked = set(missing)
+    for name in order:
+        if any(dep in blocked for dep in requires[name]):
+            blocked.add(name)
+    for name in order:
+        if name in missing:
+            fail(t("steps.site.app_requirement_missing", app=name,
+                   requires=", ".join(missing[name])))
+        elif name in blocked:
+            fail(t("steps.site.app_requirement_blocked", app=name))
+
+    order = [name for name in order if name not in blocked]
+    if order != [name for name in app_names if name not in blocked]:
+        info(t("steps.site.app_install_order", order=" → ".join(order)))
+    return order, requires
+
+
+class _AppToInstall(NamedTuple):
+    """One selected app with everything its category decides about it."""
+    name: str
+    display_name: str
+    source: str
+    branch: str
+    kind: str  # "extra", "community" or "custom"
+
+
+# Message keys per app category: (downloading, installed, failed, all done,
+# some failed)
+_APP_KIND_KEYS = {
+    "extra": ("steps.site.installing_app", "steps.site.app_installed",
+              "steps.site.app_failed", "steps.site.apps_done",
+              "steps.site.apps_some_failed"),
+    "community": ("steps.site.installing_community_app",
+                  "steps.site.community_app_installed",
+                  "steps.site.community_app_failed",
+                  "steps.site.community_apps_done",
+                  "steps.site.community_apps_some_failed"),
+    "custom": ("steps.site.installing_custom_app", "steps.site.custom_app_installed",
+               "steps.site.custom_app_failed", "steps.site.custom_apps_done",
+               "steps.site.custom_apps_some_failed"),
+}
+
+
+def _apps_to_install(cfg: Config, apps: list[tuple[str, str, str]]) -> list[_AppToInstall]:
+    """*apps* from ``_selected_apps`` with their display name and category."""
+    display = {app.repo_name: app.display_name for app in cfg.community_apps}
+    kinds = dict.fromkeys(cfg.extra_apps, "extra")
+    kinds.update((app.repo_name, "community") for app in cfg.community_apps)
+    kinds.update((app["name"], "custom") for app in cfg.custom_apps)
+    return [_AppToInstall(name, display.get(name, name), source, branch, kinds[name])
+            for name, source, branch in apps]
+
+
+def _install_apps(cfg: Config, backend, apps: list[_AppToInstall],
+                  order: list[str], requires: dict[str, list[str]],
+                  pip_done: set[str] = frozenset(),
+                  assets: _AssetBuild | None = None) -> int:
+    """Install every selected app in dependency *order*, across categories.
+
+    Apps missing from *order* (their requirements were reported by
+    ``_plan_install_order``) count as failed; so does an app whose required
+    app failed to install here, since install-app would fail on it anyway.
+    Fail-soft per app.  Returns the number of successfully installed apps.
     """
-    if not cfg.custom_apps:
+    if not apps:
         return 0
 
+    by_name = {app.name: app for app in apps}
+    queue = [by_name[name] for name in order if name in by_name]
+    failed = [app for app in apps if app.name not in order]
     console.print()
-    failed = []
 
-    for i, app in enumerate(cfg.custom_apps, 1):
-        step(t("steps.site.installing_custom_apps", current=i, total=len(cfg.custom_apps)))
-        info(t("steps.site.installing_custom_app", app=app["name"], url=app["url"]))
-
-        if _install_app(app["name"], app["name"], app["url"], app["branch"],
-                        cfg.site_name, "steps.site.custom_app_failed",
-                        executor=executor, compose_cmd=compose_cmd):
-            ok(t("steps.site.custom_app_installed", app=app["name"]))
+    for i, app in enumerate(queue, 1):
+        downloading, installed, fail_key, _, _ = _APP_KIND_KEYS[app.kind]
+        step(t("steps.site.installing_apps", current=i, total=len(queue)))
+        if any(dep in {f.name for f in failed} for dep in requires.get(app.name, [])):
+            fail(t("steps.site.app_requirement_blocked", app=app.display_name))
+            failed.append(app)
+            continue
+        info(t(downloading, app=app.display_name, url=app.source))
+
+        if _install_app(app.name, app.display_name, app.source, app.branch,
+                        cfg.site_name, fail_key, backend=backend,
+                        pip_installed=app.name in pip_done, assets=assets):
+            ok(t(installed, app=app.display_name))
         else:
-            failed.append(app["name"])
+            failed.append(app)
 
     console.print()
-    if failed:
-        fail(t("steps.site.custom_apps_some_failed", failed=len(failed), total=len(cfg.custom_apps)))
-    else:
-        ok(t("steps.site.custom_apps_done", count=len(cfg.custom_apps)))
+    for kind, (_, _, _, done_key, some_failed_key) in _APP_KIND_KEYS.items():
+        total = sum(app.kind == kind for app in apps)
+        failures = sum(app.kind == kind for app in failed)
+        if failures:
+            fail(t(some_failed_key, failed=failures, total=total))
+        elif total:
+            ok(t(done_key, count=total))
+
+    return len(apps) - len(failed)
+
 
-    return len(cfg.custom_apps) - len(failed)
+def _plan_ok(results: list, expected: int) -> bool:
+    """True if every command of a plan ran and succeeded."""
+    return len(results) == expected and all(r.ok for r in results)
 
 
-def _configure_smtp(cfg: Config, executor, compose_cmd: str):
+def _configure_smtp(cfg: Config, backend):
     """Apply SMTP settings via bench set-config."""
     if not cfg.smtp_host:
         return
     console.print()
     step(t("steps.site.configuring_smtp"))
     site_q = shlex.quote(cfg.site_name)
-    bench_cfg = f"{compose_cmd} exec -T backend bench --site {site_q} set-config"
-    failed = False
-    for code in [
-        executor.run(f"{bench_cfg} mail_server {shlex.quote(cfg.smtp_host)}"),
-        executor.run(f"{bench_cfg} mail_port {cfg.smtp_port}"),
-        executor.run(f"{bench_cfg} mail_login {shlex.quote(cfg.smtp_user)}"),
-        executor.run(f"{bench_cfg} mail_password {shlex.quote(cfg.smtp_password)}"),
-        executor.run(f"{bench_cfg} use_tls {1 if cfg.smtp_use_tls else 0}"),
-    ]:
-        if code != 0:
-            failed = True
-    if failed:
+    bench_cfg = f"bench --site {site_q} set-config"
+    plan = backend.plan()
+    plan.add(f"{bench_cfg} mail_server {shlex.quote(cfg.smtp_host)}")
+    plan.add(f"{bench_cfg} mail_port {cfg.smtp_port}")
+    plan.add(f"{bench_cfg} mail_login {shlex.quote(cfg.smtp_user)}")
+    plan.add(f"{bench_cfg} mail_password {shlex.quote(cfg.smtp_password)}")
+    plan.add(f"{bench_cfg} use_tls {1 if cfg.smtp_use_tls else 0}")
+    if not _plan_ok(plan.run(), len(plan)):
         fail(t("steps.site.smtp_failed"))
     else:
         ok(t("steps.site.smtp_configured"))
 
 
-def _configure_backup(cfg: Config, executor, compose_cmd: str):
+def _configure_backup(cfg: Config, backend):
     """Apply S3 backup settings via bench set-config."""
     if not cfg.backup_enabled:
         return
     console.print()
     step(t("steps.site.configuring_backup"))
     site_q = shlex.quote(cfg.site_name)
-    bench_cfg = f"{compose_cmd} exec -T backend bench --site {site_q} set-config"
-    failed = False
-    for code in [
-        executor.run(f"{bench_cfg} backup_bucket {shlex.quote(cfg.backup_s3_bucket)}"),
-        executor.run(f'{bench_cfg} backup_region ""'),
-        executor.run(f"{bench_cfg} backup_endpoint {shlex.quote(cfg.backup_s3_endpoint)}"),
-        executor.run(f"{bench_cfg} backup_access_key {shlex.quote(cfg.backup_s3_access_key)}"),
-        executor.run(f"{bench_cfg} backup_secret_key {shlex.quote(cfg.backup_s3_secret_key)}"),
-    ]:
-        if code != 0:
-            failed = True
-    if failed:
+    bench_cfg = f"bench --site {site_q} set-config"
+    plan = backend.plan()
+    plan.add(f"{bench_cfg} backup_bucket {shlex.quote(cfg.backup_s3_bucket)}")
+    plan.add(f'{bench_cfg} backup_region ""')
+    plan.add(f"{bench_cfg} backup_endpoint {shlex.quote(cfg.backup_s3_endpoint)}")
+    plan.add(f"{bench_cfg} backup_access_key {shlex.quote(cfg.backup_s3_access_key)}")
+    plan.add(f"{bench_cfg} backup_secret_key {shlex.quote(cfg.backup_s3_secret_key)}")
+    if not _plan_ok(plan.run(), len(plan)):
         fail(t("steps.site.backup_failed"))
     else:
         ok(t("steps.site.backup_configured"))
 
 
-def _verify_health(cfg: Config, executor, compose_cmd: str):
+def _verify_health(cfg: Config, backend):
     """Final health verification -- check site is accessible."""
     console.print()
     step(t("steps.site.verifying_health"))
     site_q = shlex.quote(cfg.site_name)
-    code = executor.run(
-        f"{compose_cmd} exec -T backend bench --site {site_q} doctor"
-    )
+    code = backend.run(f"bench --site {site_q} doctor")
     if code == 0:
         ok(t("steps.site.health_ok"))
     else:
@@ -428,50 +1056,105 @@ def run_site(cfg: Config, executor):
     compose_cmd = build_compose_cmd(cfg)
 
     step_header(5, TOTAL_STEPS, t("steps.site.title"))
-    _create_site(cfg, executor, compose_cmd)
+    backend = BackendSession(executor, compose_cmd)
+    try:
+        _run_site_steps(cfg, executor, backend, compose_cmd)
+    finally:
+        backend.close()
 
-    for extra in cfg.extra_sites:
-        _create_extra_site(extra, cfg, executor, compose_cmd)
+    _update_hosts(cfg)
+    _show_done(cfg)
 
-    installed = (
-        _install_extra_apps(cfg, executor, compose_cmd)
-        + _install_community_apps(cfg, executor, compose_cmd)
-        + _install_custom_apps(cfg, executor, compose_cmd)
-    )
 
-    # Install the same apps on extra sites (apps are already fetched,
-    # just need install-app per site)
-    for extra in cfg.extra_sites:
-        site_q = shlex.quote(extra["name"])
-        for app_name in cfg.extra_apps:
-            executor.run(
-                f"{compose_cmd} exec -T backend bench --site {site_q} "
-                f"install-app {shlex.quote(app_name)}"
-            )
-        for app in cfg.community_apps:
-            executor.run(
-                f"{compose_cmd} exec -T backend bench --site {site_q} "
-                f"install-app {shlex.quote(app.repo_name)}"
-            )
-        for app in cfg.custom_apps:
-            executor.run(
-                f"{compose_cmd} exec -T backend bench --site {site_q} "
-                f"install-app {shlex.quote(app['name'])}"
-            )
+def _run_site_steps(cfg: Config, executor, backend, compose_cmd: str):
+    """Site creation, app installs and configuration through *backend*."""
+    total_apps = len(cfg.extra_apps) + len(cfg.community_apps) + len(cfg.custom_apps)
+    installed = None
+    snapshot_key = snapshot_meta = None
+    restored = False
+    order = None
+    # (name, source, branch) of every app; branch detection hits the network
+    apps = _selected_apps(cfg) if total_apps else []
+
+    # Resume: the site from the previous run is still there
+    existing = _existing_sites(backend) if journal.resuming() else set()
+    site_inputs = (cfg.site_name, cfg.db_type)
+    resumed = journal.completed("site.create", site_inputs,
+                                probe=lambda: cfg.site_name in existing)
+    if resumed:
+        ok(t("steps.site.site_resumed", site_name=cfg.site_name))
+    elif cfg.snapshot_cache:
+        snapshot_key, snapshot_meta = snapshots.snapshot_key(cfg, apps)
+        restored = _restore_snapshot(cfg, executor, backend, compose_cmd, snapshot_key)
+        if restored:
+            installed = total_apps
+            _record_apps(cfg, _selected_app_names(cfg))
+    if not restored and not resumed:
+        bundled = _bundled_apps(cfg, backend)
+        if bundled:
+            order, _ = _plan_install_order(cfg, backend, bundled)
+            installed = _create_site_with_apps(cfg, backend, order)
+        if installed is None:
+            if total_apps:
+                with _AppPrefetch(cfg, compose_cmd, apps):
+                    _create_site(cfg, backend)
+            else:
+                _create_site(cfg, backend)
+    if not resumed:
+        journal.record("site.create", site_inputs)
+
+    cloning = cfg.extra_sites_strategy == "clone" and bool(cfg.extra_sites)
+    extra_sites = [] if cloning else _create_extra_sites(cfg, compose_cmd, existing=existing)
+
+    assets = _AssetBuild()
+    if installed is None:
+        order, requires = (_plan_install_order(cfg, backend, _selected_app_names(cfg))
+                           if total_apps else ([], {}))
+        pip_done = _pip_install_apps(cfg, backend)
+        installed = _install_apps(cfg, backend, _apps_to_install(cfg, apps),
+                                  order, requires, pip_done, assets)
+    elif not restored:
+        for app_name in order:
+            assets.add(app_name)
+
+    if cloning and all(_extra_site_done(cfg, extra["name"], existing)
+                       for extra in cfg.extra_sites):
+        _create_extra_sites(cfg, compose_cmd, existing=existing)
+    elif cloning:
+        # Extra sites are copies of the finished primary site, apps included
+        template = _prepare_site_template(cfg, backend)
+        try:
+            if template is None:
+                info(t("steps.site.template_fallback"))
+                extra_sites = _create_extra_sites(cfg, compose_cmd, existing=existing)
+                _install_apps_on_extra_sites(cfg, compose_cmd, extra_sites, order)
+            else:
+                _create_extra_sites(cfg, compose_cmd, template, existing)
+        finally:
+            backend.run(f"rm -rf {shlex.quote(_TEMPLATE_DIR)}", capture=True)
+    else:
+        _install_apps_on_extra_sites(cfg, compose_cmd, extra_sites, order)
 
-    # Full asset rebuild — ensures JS/CSS are compiled for all installed apps
-    console.print()
-    step(t("steps.site.building_assets"))
+    # Full asset build — ensures JS/CSS are compiled for all installed apps
+    # (a restored snapshot already brought its built assets along)
     site_q = shlex.quote(cfg.site_name)
-    build_code = executor.run(f"{compose_cmd} exec -T backend bench build")
-    if build_code == 0:
-        ok(t("steps.site.assets_built"))
-    else:
-        info(t("steps.site.assets_warning"))
+    build_code = 0
+    if journal.completed("site.assets", assets.apps):
+        ok(t("steps.site.assets_resumed"))
+    elif not restored:
+        build_code = assets.run(backend)
+        if build_code == 0:
+            journal.record("site.assets", assets.apps)
 
     # Clear cache to prevent stale responses (common cause of 500 errors)
-    executor.run(f"{compose_cmd} exec -T backend bench --site {site_q} clear-cache")
-    executor.run(f"{compose_cmd} exec -T backend bench --site {site_q} clear-website-cache")
+    plan = backend.plan()
+    plan.add(f"bench --site {site_q} clear-cache")
+    plan.add(f"bench --site {site_q} clear-website-cache")
+    plan.run()
+
+    # Only a complete, clean install is worth reusing
+    if snapshot_key and not restored and installed == total_apps and build_code == 0:
+        _save_snapshot(cfg, executor, backend, compose_cmd, snapshot_key, snapshot_meta)
 
     # Always restart frontend to pick up new assets — not just when extra apps installed
     console.print()
@@ -482,8 +1165,6 @@ def run_site(cfg: Config, executor):
     else:
         ok(t("steps.site.frontend_restarted"))
 
-    _configure_smtp(cfg, executor, compose_cmd)
-    _configure_backup(cfg, executor, compose_cmd)
-    _verify_health(cfg, executor, compose_cmd)
-    _update_hosts(cfg)
-    _show_done(cfg)
+    _configure_smtp(cfg, backend)
+    _configure_backup(cfg, backend)
+    _verify_health(cfg, backend)
@@ -0,0 +1,122 @@
+"""Line-by-line command output with bounded memory.
+
+``executor.run(cmd, capture=True)`` buffers a command's whole output,
+which for ``docker build``, ``bench build`` or ``bench migrate`` can be
+tens of MB.  OutputStream yields decoded lines as they arrive instead,
+keeps only the last N of them for error reports, and feeds every line
+to caller-supplied parsers (e.g. progress detection).
+"""
+
+import re
+from collections import deque
+from typing import Callable, Iterable
+
+# Default number of trailing lines kept for error reporting
+DEFAULT_TAIL = 200
+
+
+class OutputStream:
+    """Iterate over a running command's output one line at a time.
+
+    Use as a context manager; leaving the block early stops the command
+    (or drains it, for sources that cannot be stopped).  After iteration
+    finishes, ``returncode`` holds the exit status and ``tail`` the last
+    lines seen.
+
+        with executor.stream("bench build") as out:
+            for line in out:
+                ...
+        if out.returncode != 0:
+            print("\\n".join(out.tail))
+    """
+
+    def __init__(self, lines: Iterable[str], finish: Callable[[], int],
+                 abort: Callable[[], None] | None = None,
+                 tail: int = DEFAULT_TAIL,
+                 parsers: Iterable[Callable[[str], None]] = (),
+                 on_finish: Callable[["OutputStream"], None] | None = None):
+        self._lines = lines
+        self._finish = finish
+        self._abort = abort
+        self._on_finish = on_finish
+        self._done = False
+        self.tail: deque[str] = deque(maxlen=tail)
+        self.parsers = list(parsers)
+        self.returncode: int | None = None
+        self.line_count = 0
+        self.byte_count = 0
+
+    def add_parser(self, parser: Callable[[str], None]):
+        """Call *parser* with every subsequent line."""
+        self.parsers.append(parser)
+
+    def __iter__(self):
+        if self._done:
+            return
+        for raw in self._lines:
+            line = raw.rstrip("\r\n")
+            self.line_count += 1
+            self.byte_count += len(raw)
+            self.tail.append(line)
+            for parser in self.parsers:
+                parser(line)
+            yield line
+        self._complete()
+
+    def _complete(self):
+        self._done = True
+        self.returncode = self._finish()
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+    def wait(self) -> int:
+        """Consume any remaining output and return the exit code."""
+        for _ in self:
+            pass
+        return self.returncode
+
+    def abort(self):
+        """Stop the command, e.g. from another thread than the reader.
+
+        The reader's iteration then ends as the output closes.  No-op for
+        sources that cannot be stopped.
+        """
+        if self._abort is not None and not self._done:
+            self._abort()
+
+    def __enter__(self) -> "OutputStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._done:
+            return
+        if self._abort is not None:
+            self._abort()
+            self._complete()
+        else:
+            self.wait()
+
+
+class ProgressParser:
+    """Track ``current/total`` step counters found in output lines.
+
+    Matches the first regex group pair that parses as integers, so one
+    pattern can cover several output formats.
+    """
+
+    def __init__(self, pattern: str | re.Pattern):
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.current = 0
+        self.total = 0
+
+    def __call__(self, line: str):
+        m = self.pattern.search(line)
+        if not m:
+            return
+        numbers = [int(g) for g in m.groups() if g is not None]
+        if len(numbers) >= 2 and numbers[1] > 0:
+            self.current, self.total = numbers[0], numbers[1]
+
+
+# BuildKit ("#12 [builder 5/9] RUN ...") and classic builder ("Step 5/9 : RUN ...")
+DOCKER_BUILD_PROGRESS = r"^#\d+ \[(?:[^\]\s]+ )?(\d+)/(\d+)\]|^Step (\d+)/(\d+) :"
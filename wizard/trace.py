@@ -0,0 +1,151 @@
+"""Command-level trace recording (``--trace FILE``).
+
+When enabled, every executor call (run, stream, upload, session command)
+appends one JSON line to the trace file: the command with secrets
+redacted, host, start/end timestamps, duration, exit code and the number
+of stdout/stderr bytes seen (null when output went straight to the
+terminal).  ``print_summary`` lists the slowest commands afterwards.
+"""
+
+import json
+import re
+import shlex
+import threading
+import time
+
+_file = None
+_lock = threading.Lock()
+_secrets: set[str] = set()
+_durations: list[tuple[float, int | None, str, str]] = []
+
+# Flags and set-config keys whose value is always redacted, even when the
+# secret was not registered with add_secrets().
+_SECRET_ARG_RE = re.compile(
+    r"(--(?:db-root-password|admin-password|mariadb-root-password|password)[ =]"
+    r"|\b(?:mail_password|backup_access_key|backup_secret_key|encryption_key) )"
+    r"('[^']*'|\S+)"
+)
+_REDACTED = "***"
+# user:token@ in URLs, e.g. private app repositories
+_URL_USERINFO_RE = re.compile(r"\b([a-z][a-z0-9+.-]*://)[^/@\s'\"]+@", re.IGNORECASE)
+
+
+def enable(path: str):
+    """Start appending trace records to *path*."""
+    global _file
+    _file = open(path, "a", encoding="utf-8")
+
+
+def enabled() -> bool:
+    return _file is not None
+
+
+def add_secrets(*values: str):
+    """Register values (passwords, keys) that must never reach the trace."""
+    for value in values:
+        if not value:
+            continue
+        # Also the forms the value takes once quoted for the shell and
+        # once more when embedded in a quoted script (CommandPlan)
+        for form in (value, shlex.quote(value)):
+            _secrets.add(form)
+            _secrets.add(form.replace("'", "'\"'\"'"))
+
+
+def redact(cmd: str) -> str:
+    """Mask registered secrets and well-known secret arguments in *cmd*."""
+    for secret in sorted(_secrets, key=len, reverse=True):
+        cmd = cmd.replace(secret, _REDACTED)
+    cmd = _URL_USERINFO_RE.sub(lambda m: f"{m.group(1)}{_REDACTED}@", cmd)
+    return _SECRET_ARG_RE.sub(lambda m: m.group(1) + _REDACTED, cmd)
+
+
+class Span:
+    """An in-flight traced call; ``finish`` writes its record."""
+
+    def __init__(self, kind: str, cmd: str, host: str):
+        self.kind = kind
+        self.cmd = cmd
+        self.host = host
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._finished = False
+
+    def finish(self, code: int | None, stdout_bytes: int | None = None,
+               stderr_bytes: int | None = None):
+        if self._finished or _file is None:
+            return
+        self._finished = True
+        duration = time.perf_counter() - self._t0
+        cmd = redact(self.cmd)
+        record = {
+            "kind": self.kind,
+            "cmd": cmd,
+            "host": self.host,
+            "start": round(self.start, 3),
+            "end": round(self.start + duration, 3),
+            "duration": round(duration, 3),
+            "exit_code": code,
+            "stdout_bytes": stdout_bytes,
+            "stderr_bytes": stderr_bytes,
+        }
+        with _lock:
+            _file.write(json.dumps(record) + "\n")
+            _file.flush()
+            _durations.append((duration, code, self.host, cmd))
+
+
+class _NullSpan:
+    """Stand-in used while tracing is off, so call sites need no checks."""
+
+    def finish(self, code, stdout_bytes=None, stderr_bytes=None):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def begin(kind: str, cmd: str, host: str) -> Span | _NullSpan:
+    """Start timing a call; call ``finish()`` on the result when it ends."""
+    if _file is None:
+        return _NULL_SPAN
+    return Span(kind, cmd, host)
+
+
+def event(kind: str, host: str = "local", **fields):
+    """Append a free-form record for work that is not an executor call."""
+    if _file is None:
+        return
+    record = {"kind": kind, "host": host, "time": round(time.time(), 3), **fields}
+    with _lock:
+        _file.write(json.dumps(record) + "\n")
+        _file.flush()
+
+
+def print_summary(top: int = 10):
+    """Print the *top* slowest traced commands, if tracing is enabled."""
+    if _file is None or not _durations:
+        return
+    from rich.table import Table
+    from rich.text import Text
+    from rich import box
+    from .theme import console, ACCENT, HEADING, MUTED
+    from .i18n import t
+
+    slowest = sorted(_durations, key=lambda d: d[0], reverse=True)[:top]
+    table = Table(
+        title=t("common.trace_summary_title", count=len(slowest), total=len(_durations)),
+        box=box.ROUNDED,
+        border_style=ACCENT,
+        title_style=HEADING,
+    )
+    table.add_column(t("common.trace_duration"), justify="right", style="bold")
+    table.add_column(t("common.trace_exit_code"), justify="right")
+    table.add_column(t("common.trace_host"), style=MUTED)
+    table.add_column(t("common.trace_command"), overflow="fold")
+    for duration, code, host, cmd in slowest:
+        table.add_row(f"{duration:.1f}s", "-" if code is None else str(code), Text(host),
+                      Text(cmd if len(cmd) <= 120 else cmd[:117] + "…"))
+    console.print()
+    console.print(table)
+    console.print(f"  [{MUTED}]{t('common.trace_written', path=_file.name)}[/]")
@@ -1,6 +1,4 @@
-"""UI primitives: banner, step headers, status messages, progress bar."""
-
-import time
+"""UI primitives: banner, step headers, status messages, progress bars."""
 
 from rich.align import Align
 from rich.panel import Panel
@@ -98,23 +96,53 @@ def info(text: str):
     console.print(f"  [{MUTED}]   ↳ {text}[/]")
 
 
-# ── Progress bar ─────────────────────────────────────────────
+# ── Streamed command output ──────────────────────────────────
+
+def follow_stream(stream, message: str, progress=None) -> int:
+    """Consume an OutputStream behind a spinner showing its latest line.
 
-def animated_wait(seconds: int, message: str | None = None):
-    """Rich progress bar with spinner while waiting."""
-    if message is None:
-        message = t("common.waiting")
+    With a ProgressParser in *progress*, a bar tracks its current/total
+    counters.  Returns the command's exit code.
+    """
     with Progress(
         SpinnerColumn("dots", style=f"bold {ACCENT}"),
         TextColumn(f"[bold white]{message}[/]"),
-        BarColumn(bar_width=40, style=MUTED, complete_style=ACCENT, finished_style=OK),
+        BarColumn(bar_width=20, style=MUTED, complete_style=ACCENT, finished_style=OK),
+        TextColumn("{task.fields[line]}", style=MUTED, markup=False),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+    ) as bar:
+        task = bar.add_task(message, total=None, line="")
+        for line in stream:
+            fields = {"line": line.strip()[:60]}
+            if progress is not None and progress.total:
+                fields.update(total=progress.total, completed=progress.current)
+            bar.update(task, **fields)
+    return stream.returncode
+
+
+def show_tail(source, lines: int = 15):
+    """Print the last *lines* lines of an OutputStream or captured output."""
+    tail = source.splitlines() if isinstance(source, str) else list(source.tail)
+    for line in tail[-lines:]:
+        console.print(Text(f"      {line}", style=MUTED))
+
+
+# ── Concurrent tasks ─────────────────────────────────────────
+
+def task_progress() -> Progress:
+    """Multi-task progress display: one row per concurrent job.
+
+    Rows carry a ``status`` field with the job's current step.
+    """
+    return Progress(
+        SpinnerColumn("dots", style=f"bold {ACCENT}"),
+        TextColumn("[bold white]{task.description}[/]"),
+        BarColumn(bar_width=20, style=MUTED, complete_style=ACCENT, finished_style=OK),
         TaskProgressColumn(),
+        TextColumn("{task.fields[status]}", style=MUTED, markup=False),
         TimeElapsedColumn(),
         console=console,
         transient=False,
-    ) as progress:
-        task = progress.add_task(message, total=seconds)
-        for _ in range(seconds):
-            time.sleep(1)
-            progress.advance(task, 1)
-    ok(t("common.done"))
+    )
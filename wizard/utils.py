@@ -1,10 +1,13 @@
 """Shell utilities: run commands, check tools, clear screen."""
 
+import os
 import platform
 import subprocess
 
+from . import trace
 from .ui import step, ok, fail
 from .i18n import t
+from .ssh import TIMEOUT_EXIT_CODE
 
 
 def clear_screen():
@@ -14,14 +17,48 @@ def clear_screen():
     )
 
 
-def run(cmd: str, capture: bool = False) -> int | tuple[int, str, str]:
-    """Run a shell command. Returns (code, stdout, stderr) if capture=True, else code."""
+def run(cmd: str, capture: bool = False, env: dict[str, str] | None = None,
+        timeout: float | None = None) -> int | tuple[int, str, str]:
+    """Run a shell command. Returns (code, stdout, stderr) if capture=True, else code.
+
+    *env* adds variables to the inherited environment.  A command still
+    running after *timeout* seconds is killed and reported with exit code
+    124, as coreutils ``timeout`` does.
+    """
+    span = trace.begin("run", cmd, "local")
+    if env is not None:
+        env = {**os.environ, **env}
+    try:
+        if capture:
+            result = subprocess.run(cmd, shell=True, capture_output=True, text=True,
+                                    env=env, timeout=timeout)
+        else:
+            result = subprocess.run(cmd, shell=True, env=env, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        span.finish(TIMEOUT_EXIT_CODE)
+        return (TIMEOUT_EXIT_CODE, "", "") if capture else TIMEOUT_EXIT_CODE
     if capture:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        span.finish(result.returncode, len(result.stdout.encode(errors="replace")),
+                    len(result.stderr.encode(errors="replace")))
         return result.returncode, result.stdout, result.stderr
+    span.finish(result.returncode)
+    return result.returncode
+
+
+def user_cache_dir() -> str:
+    """Per-user cache directory of the wizard on this machine.
+
+    ``%LOCALAPPDATA%`` on Windows, ``~/Library/Caches`` on macOS, and
+    ``$XDG_CACHE_HOME`` (default ``~/.cache``) elsewhere.
+    """
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif system == "Darwin":
+        base = os.path.expanduser("~/Library/Caches")
     else:
-        result = subprocess.run(cmd, shell=True)
-        return result.returncode
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "erpnext-setup-wizard")
 
 
 def check_tool(name: str, cmd: str) -> str:
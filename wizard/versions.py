@@ -1,56 +1,258 @@
-"""Fetch ERPNext release versions from the GitHub API."""
+"""Fetch ERPNext release versions.
+
+Two sources provide the tag names, behind the same stable-version filter:
+
+- ``ls-remote``: one ``git ls-remote --tags`` call, no API rate limit; runs
+  locally, or on the Docker host through an executor.
+- ``rest``: the paginated GitHub tags API.  Pages are fetched concurrently
+  and revalidated by ETag (a 304 costs no rate limit).
+
+They are tried in that order.  The resulting list is cached in
+``versions.json`` under the user cache dir: a fresh cache is used as is,
+and without network it is served for up to ``_OFFLINE_TTL``.
+
+``python -m wizard.versions`` times both sources.
+"""
 
 import json
+import os
 import re
+import shlex
+import statistics
+import sys
+import time
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+from rich.table import Table
+from rich import box
+
+from .apps import GIT_NO_PROMPT
+from .theme import console, ACCENT, ERR
+from .utils import run, user_cache_dir
 
 _TAGS_URL = "https://api.github.com/repos/frappe/erpnext/tags"
+_REPO_URL = "https://github.com/frappe/erpnext.git"
 _PER_PAGE = 100
 _TIMEOUT = 10
 _MIN_MAJOR = 14
 _MAX_PAGES = 20
 _STABLE_RE = re.compile(r"^v(\d+)\.(\d+)\.(\d+)$")
+_LAST_PAGE_RE = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+_CACHE_FILE = "versions.json"
+_CACHE_VERSION = 2
+_FRESH_TTL = 15 * 60            # seconds a cached list is used without asking
+_OFFLINE_TTL = 30 * 24 * 3600   # seconds a cached list is served when offline
+_WORKERS = 8
+
+
+class VersionSourceError(Exception):
+    """A version source could not deliver the tag list."""
+
+
+def _is_stable(name: str) -> bool:
+    """True for a vX.Y.Z release tag of a supported major version."""
+    m = _STABLE_RE.match(name)
+    return bool(m) and int(m.group(1)) >= _MIN_MAJOR
+
 
+def _sort_key(v: str) -> tuple[int, ...]:
+    m = _STABLE_RE.match(v)
+    return (int(m.group(1)), int(m.group(2)), int(m.group(3))) if m else (0, 0, 0)
 
-def fetch_erpnext_versions() -> list[str]:
-    """Fetch stable ERPNext versions (v14+) from GitHub Tags API.
 
-    Returns a list of version strings sorted newest-first.
-    Returns an empty list on any network/API failure.
+def stable_versions(names: Iterable[str]) -> list[str]:
+    """Stable versions among tag *names*, newest first, without duplicates."""
+    return sorted({name for name in names if _is_stable(name)}, key=_sort_key, reverse=True)
+
+
+def _cache_path() -> str:
+    return os.path.join(user_cache_dir(), _CACHE_FILE)
+
+
+def _load_cache() -> dict:
+    try:
+        with open(_cache_path(), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if cache.get("version") == _CACHE_VERSION else {}
+
+
+def _save_cache(tags: list[str], pages: dict[int, dict], previous: dict):
+    """Store the version list and the REST pages with their fetch times.
+
+    Without new *pages* (ls-remote answered), the *previous* cache's pages
+    are kept under their own, older time so they can still be revalidated.
     """
-    tags: list[str] = []
-    page = 1
+    path = _cache_path()
+    now = time.time()
+    if pages:
+        stored, pages_fetched = {str(page): entry for page, entry in pages.items()}, now
+    else:
+        stored = previous.get("pages", {})
+        pages_fetched = previous.get("pages_fetched", previous.get("fetched", now))
+    cache = {
+        "version": _CACHE_VERSION,
+        "fetched": now,
+        "tags": tags,
+        "pages": stored,
+        "pages_fetched": pages_fetched,
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a cache that cannot be written only costs the next run time
+
+
+def _fetch_page(page: int, etag: str = "") -> tuple[int, dict | None, int]:
+    """GET one page of tags, conditionally if *etag* is given.
 
+    Returns (status, entry, last_page): entry is {"etag", "tags", "count"}
+    for a 200 and None for a 304; last_page comes from the Link header
+    (0 if absent).
+    """
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if etag:
+        headers["If-None-Match"] = etag
+    req = urllib.request.Request(
+        f"{_TAGS_URL}?per_page={_PER_PAGE}&page={page}", headers=headers,
+    )
     try:
-        while page <= _MAX_PAGES:
-            url = f"{_TAGS_URL}?per_page={_PER_PAGE}&page={page}"
-            req = urllib.request.Request(
-                url, headers={"Accept": "application/vnd.github.v3+json"}
-            )
-            with urllib.request.urlopen(req, timeout=_TIMEOUT) as resp:
-                data = json.loads(resp.read().decode())
+        with urllib.request.urlopen(req, timeout=_TIMEOUT) as resp:
+            data = json.loads(resp.read().decode())
+            link = resp.headers.get("Link", "")
+            new_etag = resp.headers.get("ETag", "")
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, 0
+        raise
 
-            if not data:
-                break
+    tags = [tag["name"] for tag in data if _is_stable(tag["name"])]
+    m = _LAST_PAGE_RE.search(link)
+    entry = {"etag": new_etag, "tags": tags, "count": len(data)}
+    return 200, entry, int(m.group(1)) if m else 0
 
-            for tag in data:
-                name = tag["name"]
-                m = _STABLE_RE.match(name)
-                if m and int(m.group(1)) >= _MIN_MAJOR:
-                    tags.append(name)
 
-            if len(data) < _PER_PAGE:
+def _fetch_pages(cached: dict[int, dict]) -> dict[int, dict]:
+    """Bring every page up to date, revalidating the *cached* ones."""
+    status, entry, last = _fetch_page(1, cached.get(1, {}).get("etag", ""))
+    pages = {1: entry if status == 200 else cached[1]}
+    if status == 200 and last:
+        count = min(last, _MAX_PAGES)
+    elif status == 200:
+        count = 1
+    else:
+        count = max(cached)
+
+    with ThreadPoolExecutor(max_workers=_WORKERS) as pool:
+        while True:
+            todo = [page for page in range(2, count + 1) if page not in pages]
+            results = pool.map(
+                lambda page: (page, _fetch_page(page, cached.get(page, {}).get("etag", ""))),
+                todo,
+            )
+            for page, (status, entry, _) in results:
+                pages[page] = entry if status == 200 else cached[page]
+            # Tags were added past the last known page
+            if pages[count]["count"] < _PER_PAGE or count >= _MAX_PAGES:
                 break
-            page += 1
+            count += 1
+    return pages
+
 
-    except (urllib.error.URLError, OSError, json.JSONDecodeError, KeyError, TypeError):
-        return []
+# ── Sources ─────────────────────────────────────────────────────
+# Each takes (executor, cache) and returns tag names and the REST pages to
+# cache, raising VersionSourceError when it cannot answer.
+
+_SOURCE_ERRORS = (urllib.error.URLError, OSError, json.JSONDecodeError, KeyError, TypeError)
+
+
+def _from_ls_remote(executor, cache: dict) -> tuple[list[str], dict[int, dict]]:
+    """All tags from a single ``git ls-remote``, on *executor* if given."""
+    cmd = f"git ls-remote --tags --refs {shlex.quote(_REPO_URL)}"
+    if executor is not None:
+        code, stdout, _ = executor.run(f"GIT_TERMINAL_PROMPT=0 {cmd}", capture=True)
+    else:
+        code, stdout, _ = run(cmd, capture=True, env=GIT_NO_PROMPT)
+    names = [line.split("\t", 1)[1].removeprefix("refs/tags/")
+             for line in stdout.splitlines() if "\t" in line]
+    if code != 0 or not names:
+        raise VersionSourceError("git ls-remote failed")
+    return names, {}
+
+
+def _from_rest(executor, cache: dict) -> tuple[list[str], dict[int, dict]]:
+    """All stable tags from the GitHub API, revalidating cached pages."""
+    cached = {int(page): entry for page, entry in cache.get("pages", {}).items()}
+    try:
+        pages = _fetch_pages(cached)
+    except _SOURCE_ERRORS as e:
+        raise VersionSourceError(str(e)) from e
+    return [tag for page in sorted(pages) for tag in pages[page]["tags"]], pages
+
+
+SOURCES: dict[str, Callable] = {
+    "ls-remote": _from_ls_remote,
+    "rest": _from_rest,
+}
+
+
+def fetch_erpnext_versions(executor=None, sources: Iterable[str] = ("ls-remote", "rest")) -> list[str]:
+    """Fetch stable ERPNext versions (v14+), newest first.
+
+    Tries *sources* in order (see ``SOURCES``); ls-remote runs through
+    *executor* if given, else locally.  Returns the cached list, or an
+    empty list, if every source fails.
+    """
+    cache = _load_cache()
+    age = time.time() - cache.get("fetched", 0)
+    if cache.get("tags") and age < _FRESH_TTL:
+        return cache["tags"]
+
+    for name in sources:
+        try:
+            names, pages = SOURCES[name](executor, cache)
+        except VersionSourceError:
+            continue
+        tags = stable_versions(names)
+        _save_cache(tags, pages, cache)
+        return tags
+
+    if cache.get("tags") and age <= _OFFLINE_TTL:
+        return cache["tags"]
+    return []
+
+
+def _benchmark(runs: int = 3):
+    """Print the latency of each source, without the cache."""
+    table = Table(box=box.ROUNDED, border_style=ACCENT)
+    table.add_column("source", style="bold")
+    for column in ("median", "min", "versions", "runs"):
+        table.add_column(column, justify="right")
+    for name, source in SOURCES.items():
+        timings = []
+        count = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            try:
+                count = len(stable_versions(source(None, {})[0]))
+            except VersionSourceError as e:
+                table.add_row(name, f"[{ERR}]failed: {e}[/]", "", "", "")
+                break
+            timings.append(time.perf_counter() - start)
+        if timings:
+            table.add_row(name, f"{statistics.median(timings):.2f}s", f"{min(timings):.2f}s",
+                          str(count), str(len(timings)))
+    console.print(table)
 
-    def _sort_key(v: str) -> tuple[int, ...]:
-        m = _STABLE_RE.match(v)
-        return (int(m.group(1)), int(m.group(2)), int(m.group(3))) if m else (0, 0, 0)
 
-    # Sort by semver descending (newest first)
-    tags.sort(key=_sort_key, reverse=True)
-    return tags
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)